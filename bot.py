@@ -7,6 +7,7 @@ import logging
 from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
 
+import aiohttp
 import discord
 from discord.ext import commands
 
@@ -35,24 +36,28 @@ import uvicorn  # noqa: E402
 
 # ── Logging ───────────────────────────────────────────────────────────────────
 log = logging.getLogger("celestiguard")
-log.setLevel(logging.INFO)
 
-_formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+def _configure_logging() -> None:
+    """Attach console + rotating file handlers once (safe if bot.py is imported twice)."""
+    if log.handlers:
+        return
+    log.setLevel(logging.INFO)
+    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
 
-# console
-_ch = logging.StreamHandler(sys.stdout)
-_ch.setFormatter(_formatter)
-log.addHandler(_ch)
+    # console
+    ch = logging.StreamHandler(sys.stdout)
+    ch.setFormatter(formatter)
+    log.addHandler(ch)
 
-# rotating file (~/CelestiGuard/logs/celestiguard.log or ./logs/celestiguard.log)
-logs_dir = os.path.join(os.getcwd(), "logs")
-os.makedirs(logs_dir, exist_ok=True)
-_fh = RotatingFileHandler(os.path.join(logs_dir, "celestiguard.log"),
-                          maxBytes=2_000_000, backupCount=5, encoding="utf-8")
-_fh.setFormatter(_formatter)
-log.addHandler(_fh)
+    # rotating file (~/CelestiGuard/logs/celestiguard.log or ./logs/celestiguard.log)
+    logs_dir = os.path.join(os.getcwd(), "logs")
+    os.makedirs(logs_dir, exist_ok=True)
+    fh = RotatingFileHandler(os.path.join(logs_dir, "celestiguard.log"),
+                             maxBytes=2_000_000, backupCount=5, encoding="utf-8")
+    fh.setFormatter(formatter)
+    log.addHandler(fh)
 
-discord.utils.setup_logging(level=logging.INFO, root=False)
+    discord.utils.setup_logging(level=logging.INFO, root=False)
 
 if not DISCORD_TOKEN:
     raise SystemExit("❌ Set DISCORD_TOKEN in your .env file!")
@@ -77,10 +82,16 @@ async def _load_cogs_safely() -> None:
         except Exception as e:
             log.error("Failed to load cog %s: %s", ext, e)
 
+# on_ready fires again on every reconnect; only push slash commands the first time.
+_synced = False
+
 @bot.event
 async def on_ready():
+    global _synced
     assert bot.user is not None  # quiet type checker
-    await bot.tree.sync()
+    if not _synced:
+        await bot.tree.sync()
+        _synced = True
     try:
         await bot.change_presence(activity=discord.Game(name="counting | /setcountingchannel"))
     except Exception:
@@ -100,7 +111,16 @@ async def on_ready():
 
     log.info("✅ CelestiGuard online as %s (%s) | v%s", bot.user, bot.user.id, CELESTIGUARD_VERSION)
 
+@bot.command(name="sync")
+@commands.is_owner()
+async def sync_commands(ctx: commands.Context):
+    """Re-sync slash commands after loading/unloading extensions (owner only)."""
+    synced = await bot.tree.sync()
+    await ctx.reply(f"🔄 Synced {len(synced)} slash commands.")
+
 async def main():
+    _configure_logging()
+
     # Start FastAPI dashboard alongside the bot
     set_bot(bot)
     app = create_app(version=CELESTIGUARD_VERSION)
@@ -112,6 +132,11 @@ async def main():
     # Launch dashboard
     dash_task = asyncio.create_task(server.serve())
 
+    # discord.py already keeps one REST session for the bot's lifetime; give it a connector
+    # that holds DNS answers and idle keep-alive sockets longer than aiohttp's defaults.
+    # Built here because aiohttp connectors need the running loop.
+    bot.http.connector = aiohttp.TCPConnector(limit=0, ttl_dns_cache=300, keepalive_timeout=60)
+
     # Launch bot
     async with bot:
         await _load_cogs_safely()
@@ -1,21 +1,47 @@
 from __future__ import annotations
+import re
+import os
+import time
 import asyncio
+import json
 import datetime as dt
+import logging
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Optional, Tuple
 
 import aiohttp
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-from services.db import get_conn, init as db_init
+from services.db import locked, transaction, init as db_init
+
+try:  # optional: C decoder for the (changelog-heavy) API responses
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+log = logging.getLogger("celestiguard")
 
 API_BASE = "https://api.curseforge.com/v1"
 
+_REL_TYPE = {1: "Release", 2: "Beta", 3: "Alpha"}
+_BR_RE = re.compile(r"<br\s*/?>", re.IGNORECASE)
+_CF_GREEN = discord.Colour.from_rgb(46, 204, 113) # green status bar
+
 #----------------UI helpers--------------------------
 
+@lru_cache(maxsize=1024)
 def _discord_ts_iso(ts: str | None) -> Optional[int]:
     if not ts:
         return None
+    # CurseForge sends UTC like 2024-01-31T12:34:56.789Z; parse that directly.
+    try:
+        when = dt.datetime.strptime(ts, "%Y-%m-%dT%H:%M:%S.%fZ")
+        return int(when.replace(tzinfo=dt.timezone.utc).timestamp())
+    except ValueError:
+        pass
     try:
         when = dt.datetime.fromisoformat(ts.replace("Z", "+00:00"))
         return int(when.timestamp())
@@ -25,40 +51,47 @@ def _discord_ts_iso(ts: str | None) -> Optional[int]:
 def _short(text: str, limit: int = 700) -> str:
     if not text:
         return ""
+    if len(text) <= limit:
+        return text.strip()
     text = text.strip()
     return (text[: limit - 1]+ "…") if len(text) > limit else text
 
-class CFButtons(discord.ui.view):
+class CFButtons(discord.ui.View):
     def __init__(self, download_url: str, project_url: str):
         super().__init__(timeout=None)
         self.add_item(discord.ui.Button(label="Download", url=download_url))
         self.add_item(discord.ui.Button(label="Project Page", url=project_url))
 
+def cf_buttons(download_url: str, project_url: str) -> CFButtons:
+    """A new link-button view; call once per send, since a View is per-message state."""
+    return CFButtons(download_url, project_url)
+
 def build_status_embed(file: dict, project_id: int, project_name: Optional[str]) -> discord.Embed:
     file_name = file.get("displayName") or file.get("fileName") or "New file"
     download_url = file.get("downloadUrl") or file.get("fileUrl") or f"https://www.curseforge.com/projects/{project_id}"
     project_url = f"https://www.curseforge.com/projects/{project_id}"
 
     versions = ", ".join(file.get("gameVersions") or []) or "-"
-    rel_type = {1: "Release", 2: "Beta", 3: "Alpha"}.get(file.get("releaseType"), "Release")
+    rel_type = _REL_TYPE.get(file.get("releaseType"), "Release")
     iso = file.get("fileDate")
     ts = _discord_ts_iso(iso)
 
-    notes_raw = (file.get("changelog") or "").replace("<br>", "\n").replace("<br/>", "<\n>")
+    changelog = file.get("changelog") or ""
+    notes_raw = _BR_RE.sub("\n", changelog) if "<" in changelog else changelog
     notes = _short(notes_raw, 700)
 
     embed = discord.Embed(
         title=file_name,
         url=download_url,
         description=notes or "No changelog provided.",
-        color=discord.from_rgb(46, 204, 113), #green status bar
+        color=_CF_GREEN,
     )
     embed.add_field(name="Status", value=f"**{rel_type}** - Ready to download", inline=False)
     embed.add_field(name="Affected", value=project_name or f"Curseforge Project #{project_id}", inline=False)
 
     if ts:
         embed.add_field(name="Updated", value=f"<t:{ts}:R>", inline=False)
-        embed.set.footer(text=f"Released: <t:{ts}:f>")
+        embed.set_footer(text=f"Released: <t:{ts}:f>")
     else:
         embed.add_field(name="Updated", value=f"<t:{ts}:R>", inline=False)
     
@@ -68,23 +101,65 @@ def build_status_embed(file: dict, project_id: int, project_name: Optional[str])
 
 #---------------DB helpers---------------
 
-def _ensure_tables():
-    db_init()
-    with get_conn() as c:
-        c.execute("""
-        CREATE TABLE IF NOT EXISTS cf_subs (
+# The PK b-tree *is* the row (WITHOUT ROWID), so the poll's GROUP BY project_id
+# is a straight clustered scan with no rowid hop.
+_CF_SUBS_DDL = """
+        CREATE TABLE IF NOT EXISTS {name} (
         project_id INTEGER NOT NULL,
         guild_id INTEGER NOT NULL,
         channel_id INTEGER NOT NULL,
         mention TEXT,
         last_file_id INTEGER,
         PRIMARY KEY(project_id, guild_id)
+        ) WITHOUT ROWID
+        """
+
+def _migrate_cf_subs_without_rowid(c):
+    """One-shot rebuild of a cf_subs created before it was WITHOUT ROWID."""
+    row = c.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='cf_subs'").fetchone()
+    if row is None or "WITHOUT ROWID" in (row["sql"] or "").upper():
+        return
+    with transaction() as t:
+        t.execute("DROP TABLE IF EXISTS cf_subs_new")
+        t.execute(_CF_SUBS_DDL.format(name="cf_subs_new"))
+        t.execute("""
+        INSERT INTO cf_subs_new(project_id, guild_id, channel_id, mention, last_file_id)
+          SELECT project_id, guild_id, channel_id, mention, last_file_id FROM cf_subs
+        """)
+        t.execute("DROP TABLE cf_subs")
+        t.execute("ALTER TABLE cf_subs_new RENAME TO cf_subs")
+
+_tables_ready = False
+
+def _ensure_tables():
+    global _tables_ready
+    if _tables_ready:
+        return
+    db_init()
+    with locked() as c:
+        _migrate_cf_subs_without_rowid(c)
+        c.execute(_CF_SUBS_DDL.format(name="cf_subs"))
+        # HTTP validators from the last 200 response, per project (shared by all guild subs)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS curseforge_poll (
+        project_id INTEGER PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        last_file_id INTEGER,
+        project_name TEXT,
+        project_name_fetched_at INTEGER
         )
         """)
+        # Redundant with the clustered PK (the planner never picked it); only cost writes.
+        c.execute("DROP INDEX IF EXISTS idx_cf_subs_project")
+        have = {r["name"] for r in c.execute("PRAGMA table_info(curseforge_poll)")}
+        for col, decl in (("project_name", "TEXT"), ("project_name_fetched_at", "INTEGER")):
+            if col not in have:
+                c.execute(f"ALTER TABLE curseforge_poll ADD COLUMN {col} {decl}")
+    _tables_ready = True
 
 def add_or_update_sub(project_id: int, guild_id: int, channel_id: int, mention: Optional[str]):
-    _ensure_tables()
-    with get_conn() as c:
+    with locked() as c:
         c.execute("""
         INSERT INTO cf_subs(project_id, guild_id, channel_id, mention, last_file_id)
           VALUES(?,?,?,?,COALESCE((SELECT last_file_id FROM cf_subs WHERE project_id=? AND guild_id=?), NULL))
@@ -93,136 +168,319 @@ def add_or_update_sub(project_id: int, guild_id: int, channel_id: int, mention:
             mention=excluded.mention
         """,(project_id, guild_id, channel_id, mention, project_id, guild_id))
 
-    def remove_sub(project_id: int, guild_id: int) -> bool:
-        _ensure_tables()
-        with get_conn() as c:
-            cur = c.execute("DELETE FROM cf_subs WHERE project_id=? AND guild_id=?", (project_id, guild_id))
-            return cur.rowcount > 0
-    
-    def list_subs(guild_id: int):
-        _ensure_tables
-        with get_conn() as c:
-            return [dict(r) for r in c.execute("SELECT * FROM cf_subs WHERE guild_id=?", (guild_id)).fetchall()]
-
-    def update_last_file_id(project_id: int, guild_id: int, file_id: int):
-        with get_conn() as c:
-            c.execute("UPDATE cf_subs SET last_file_id=? WHERE project_id=? AND guild_id=?", (file_id, project_id, guild_id))
-
-    def fetch_all_subs():
+def remove_sub(project_id: int, guild_id: int) -> bool:
+    with locked() as c:
+        cur = c.execute("DELETE FROM cf_subs WHERE project_id=? AND guild_id=?", (project_id, guild_id))
+        return cur.rowcount > 0
+
+def list_subs(guild_id: int) -> list[tuple[int, int, Optional[str]]]:
+    """(project_id, channel_id, mention) for each subscription in the guild."""
+    with locked() as c:
+        return [tuple(r) for r in c.execute(
+            "SELECT project_id, channel_id, mention FROM cf_subs WHERE guild_id=?", (guild_id,)
+        ).fetchall()]
+
+def update_last_file_ids(updates: list[tuple[int, int, int]]):
+    """Apply (file_id, project_id, guild_id) rows in one transaction."""
+    if not updates:
+        return
+    with transaction() as c:
+        c.executemany("UPDATE cf_subs SET last_file_id=? WHERE project_id=? AND guild_id=?", updates)
+
+def fetch_subs_by_project() -> dict[int, list[dict]]:
+    """project_id -> subscriptions, grouped by SQLite in one clustered pass."""
+    with locked() as c:
+        rows = c.execute("""
+        SELECT project_id,
+               json_group_array(json_object(
+                 'guild_id', guild_id, 'channel_id', channel_id,
+                 'mention', mention, 'last_file_id', last_file_id)) AS subs
+          FROM cf_subs
+         GROUP BY project_id
+        """).fetchall()
+    return {int(r["project_id"]): _json_loads(r["subs"]) for r in rows}
+
+def get_poll_row(project_id: int) -> Optional[dict]:
+    with locked() as c:
+        row = c.execute("SELECT * FROM curseforge_poll WHERE project_id=?", (project_id,)).fetchone()
+    return dict(row) if row else None
+
+def save_poll_validators(project_id: int, etag: Optional[str], last_modified: Optional[str], last_file_id: Optional[int]):
+    with locked() as c:
+        c.execute("""
+        INSERT INTO curseforge_poll(project_id, etag, last_modified, last_file_id)
+          VALUES(?,?,?,?)
+          ON CONFLICT(project_id) DO UPDATE SET
+            etag=excluded.etag,
+            last_modified=excluded.last_modified,
+            last_file_id=excluded.last_file_id
+        """, (project_id, etag, last_modified, last_file_id))
+
+def save_project_name(project_id: int, name: str):
+    with locked() as c:
+        c.execute("""
+        INSERT INTO curseforge_poll(project_id, project_name, project_name_fetched_at)
+          VALUES(?,?,?)
+          ON CONFLICT(project_id) DO UPDATE SET
+            project_name=excluded.project_name,
+            project_name_fetched_at=excluded.project_name_fetched_at
+        """, (project_id, name, int(time.time())))
+
+#--------------------API----------------------
+# The session passed in already carries the x-api-key header and timeouts.
+
+async def fetch_latest_file(session: aiohttp.ClientSession, project_id: int,
+                            etag: Optional[str] = None, last_modified: Optional[str] = None
+                            ) -> Tuple[int, Optional[dict], Optional[str], Optional[str]]:
+    """
+    Returns (status, newest file or None, etag, last_modified).
+    Pass the stored validators to make the request conditional; on 304 the body is
+    never read and the validators passed in are handed back unchanged.
+    """
+    url = f"{API_BASE}/mods/{project_id}/files"
+    params = {"pageSize": 1, "sortOrder": "desc"} # newest first
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    async with session.get(url, params=params, headers=headers) as r:
+        if r.status == 304:
+            return 304, None, etag, last_modified
+        if r.status !=200:
+            return r.status, None, etag, last_modified
+        data = await r.json(loads=_json_loads)
+        arr = (data or {}).get("data") or []
+        return 200, (arr[0] if arr else None), r.headers.get("ETag"), r.headers.get("Last-Modified")
+
+async def fetch_project_name(session: aiohttp.ClientSession, project_id: int) -> Optional[str]:
+    url = f"{API_BASE}/mods/{project_id}"
+    async with session.get(url) as r:
+        if r.status != 200:
+            return None
+        data = await r.json(loads=_json_loads)
+        return (data or {}).get("data", {}).get("name")
+
+CF_REQUESTS_PER_SEC = 5
+PROJECT_NAME_TTL = 86400
+PROJECT_NAME_CACHE_MAX = 1024
+
+class _RateLimiter:
+    """Small token bucket: at most `rate` acquisitions per `per` seconds, bursts up to `rate`."""
+    def __init__(self, rate: float, per: float):
+        self.rate = rate
+        self.per = per
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.per)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+#--------------------Cog----------------
+
+class CurseForgeUpdates(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
         _ensure_tables()
-        with get_conn() as c:
-            return [dict(r) for r in c.execute("SELECT * FROM cf_subs").fetchall()]
-
-    #--------------------API----------------------
+        self.api_key = os.getenv("CURSEFORGE_API_KEY")
+        self.poll_seconds = int(os.getenv("CF_POLL_SECONDS", "300"))
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._poll_sem = asyncio.Semaphore(8)
+        self._limiter = _RateLimiter(CF_REQUESTS_PER_SEC, 1.0)
+        self._name_cache: "OrderedDict[int, tuple[float, str]]" = OrderedDict()
+
+    async def cog_load(self):
+        if self.api_key:
+            # One pooled keep-alive session for the cog's lifetime (no TLS handshake per request)
+            self.session = aiohttp.ClientSession(
+                headers={"x-api-key": self.api_key},
+                timeout=aiohttp.ClientTimeout(total=20),
+                connector=aiohttp.TCPConnector(limit=32, limit_per_host=8, keepalive_timeout=75, ttl_dns_cache=300),
+            )
+            # Poll only when there's a key; the loop itself sleeps between ticks.
+            self.poll_task.change_interval(seconds=self.poll_seconds)
+            self.poll_task.start()
 
-    async def fetch_latest_file(session: aiohttp.ClientSession, api_key: str, project_id: int) -> Optional[dict]:
-        url = f"{API_BASE}/mods/{project_id}/files"
-        headers = {"x-api-key": api_key}
-        params = {"pageSize": 1, "sortOrder": "desc"} # newest first
-        async with session.get(url, headers=headers, params=params, timeout=20) as r:
-            if r.status !=200:
+    async def cog_unload(self):
+        self.poll_task.cancel()
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    async def _poll_project(self, project_id: int, horizon: int):
+        """
+        Fetch one project (bounded by the semaphore + rate limiter).
+        Returns (latest, name, validators) when some subscriber is behind, else None;
+        the caller stores validators only after the announcements went out.
+        """
+        async with self._poll_sem:
+            await self._limiter.acquire()
+            poll = get_poll_row(project_id) or {}
+            # Only ask conditionally when every sub already has the newest file we know of:
+            # a brand-new sub (no last_file_id) or one left behind by a failed send
+            # must get a full 200 again, not a 304.
+            if not horizon or horizon < (poll.get("last_file_id") or 0):
+                etag = last_modified = None
+            else:
+                etag, last_modified = poll.get("etag"), poll.get("last_modified")
+            status, latest, etag, last_modified = await fetch_latest_file(
+                self.session, project_id, etag, last_modified
+            )
+            if status != 200:
+                return None  # 304: nothing new, no JSON parsed, no name lookup
+            latest_id = int(latest.get("id") or 0) if latest else None
+            validators = (project_id, etag, last_modified, latest_id)
+            if not latest or latest_id <= horizon:
+                # Nothing to dispatch (every subscriber already has it): safe to store now.
+                save_poll_validators(*validators)
                 return None
-            data = await r.json()
-            arr = (data or {}).get("data") or []
-            return arr[0] if arr else None
-
-    async def fetch_project_name(session: aiohttp.ClientSession, api_key: str, project_id: int) -> Optional[dict]:\
-        headers = {"x-api-key": api_key}
-        url = f"{API_BASE}/mods/{project_id}"
-        async with session.get(url, headers=headers, timeout=15) as r:
-            if r.status != 200:
+
+            return latest, await self._cached_project_name(project_id, poll), validators
+
+    async def _cached_project_name(self, project_id: int, poll: dict) -> Optional[str]:
+        """Project names barely change: memory first, then the stored name, then /mods/{id} (24h TTL)."""
+        now = time.time()
+        hit = self._name_cache.get(project_id)
+        if hit and now - hit[0] < PROJECT_NAME_TTL:
+            self._name_cache.move_to_end(project_id)
+            return hit[1]
+
+        name = poll.get("project_name")
+        fetched_at = poll.get("project_name_fetched_at") or 0
+        if not name or now - fetched_at >= PROJECT_NAME_TTL:
+            await self._limiter.acquire()
+            name = await fetch_project_name(self.session, project_id) or name
+            if not name:
                 return None
-            data = await r.json()
-            return (data or {}).get("data", {}).get("name")
-
-    #--------------------Cog----------------
-
-    class CurseForgeUpdates(commands.Cog):
-        def __init__(self, bot: commands.Bot):
-            self.bot = bot
-            _ensure_tables()
-            self.api_key = None
-            self.poll_seconds = None
-            self.session: Optional[aiohttp.ClientSession] = None
-            self.poll_task.start()
+            fetched_at = now
+            save_project_name(project_id, name)
+
+        self._name_cache[project_id] = (fetched_at, name)
+        self._name_cache.move_to_end(project_id)
+        if len(self._name_cache) > PROJECT_NAME_CACHE_MAX:
+            self._name_cache.popitem(last=False)
+        return name
+
+    def _sub_channel(self, sub: dict) -> Optional[discord.abc.Messageable]:
+        """The subscription's channel if the bot can currently post there, else None."""
+        guild = self.bot.get_guild(int(sub["guild_id"]))
+        if not guild:
+            return None
+        channel = guild.get_channel(int(sub["channel_id"]))
+        if not isinstance(channel, (discord.TextChannel, discord.Thread)):
+            return None
+        return channel
+
+    async def _queue_announcements(self, project_id: int, project_subs: list[tuple[dict, discord.abc.Messageable]],
+                                   latest: dict, project_name: Optional[str], outbox: dict[int, list]):
+        """Queue the new file for every subscriber that is behind, keyed by channel id."""
+        latest_id = int(latest.get("id") or 0)
+        # Changelog cleanup/truncation can be sizeable; keep it off the event loop.
+        embed = await asyncio.to_thread(build_status_embed, latest, project_id, project_name)
+        project_url = f"https://www.curseforge.com/projects/{project_id}"
+        download_url = latest.get("downloadUrl") or latest.get("fileUrl") or project_url
+
+        for sub, channel in project_subs:
+            last_seen = sub.get("last_file_id")
+            if last_seen and latest_id <= int(last_seen):
+                continue
+
+            content = None
+            mention = sub.get("mention")
+            if mention:
+                mention = mention.strip()
+                if mention.isdigit():
+                    content = f"<@&{mention}>"
+                else:
+                    content = mention
+
+            outbox.setdefault(channel.id, []).append(
+                (channel, {"content": content, "embed": embed,
+                           "view": cf_buttons(download_url, project_url)},
+                 (latest_id, project_id, int(sub["guild_id"])))
+            )
+
+    @staticmethod
+    async def _drain(messages: list) -> list[tuple[int, int, int]]:
+        """Send one channel's queue in order; returns the last_file_id updates that went out."""
+        sent = []
+        for channel, kwargs, update in messages:
+            try:
+                await channel.send(**kwargs)
+            except Exception:
+                continue
+            sent.append(update)
+        return sent
+
+    @tasks.loop(seconds=300.0) # interval replaced with CF_POLL_SECONDS in cog_load
+    async def poll_task(self):
+        if self.session is None:
+            return
+        # tasks.loop only survives network errors; anything else (e.g. "database is locked")
+        # would end the loop for good, so log it and try again next interval.
+        try:
+            await self._poll_cycle()
+        except Exception:
+            log.exception("CurseForge poll cycle failed")
+
+    async def _poll_cycle(self):
+        # One request per project, fanned out to every guild subscribed to it.
+        by_project = fetch_subs_by_project()
+        if not by_project:
+            return
 
-        def cog_unload(self):
-            self.poll_task.cancel()
-            if self.session and not self.session.closed:
-                asyncio.create_task(self.session.close())
-
-        @tasks.loop(seconds=30.0)
-        async def poll_task(self):
-            if self.api_key is None:
-                import os
-                self.api_key = os.getenv("CURSEFORGE_API_KEY")
-                self.poll_seconds = int(os.getenv("CF_POLL_SECONDS", "300"))
-
-            if not self.api_key:
-                await asyncio.sleep(60)
-                return
-
-            if self.session is None or self.session.closed:
-                self.session = aiohttp.ClientSession()
-
-            subs = fetch_all_subs()
-            if not subs:
-                await asyncio.sleep(self.poll_seconds)
-                return
-
-            for sub in subs:
-                project_id = int(sub["project_id"])
-                guild = self.bot.get_guild(int(sub["channel_id"]))
-                if not guild:
-                    continue
-                channel = guild.get_channel(int(sub[channel_id]))
-                if not isinstance(channel, (discord.TextChannel, discord.Thread)):
-                    continue
-
-                try:
-                    latest = await fetch_latest_file(self.session, self.api_key, project_id)
-                    if not latest:
-                        continue
-
-                    latest_id = int(latest.get("id") or 0)
-                    last_seen = sub.get("last_file_id")
-                    if last_seen and latest_id <= int(last_seen):
-                        continue
-
-                    project_name = await fetch_project_name(self.session, self.api_key, project_id)
-                    embed = build_status_embed(latest, project_id, project_name)
-                    project_url = f"https://www.curseforge.com/projects/{project_id}"
-                    download_url = latest.get("downloadUrl") or latest.get("fileUrl") or project_url
-                    view = CFButtons(download_url, project_url)
-
-                    content = None
-                    mention = sub.get("mention")
-                    if mention:
-                        mention = mention.strip()
-                        if mention.isdigit():
-                            content = f"<@&{mention}>"
-                        else:
-                            content = mention
-
-                    await channel.send(content=content, embed=embed, view=view)
-                    update_last_file_id(project_id, int(sub["guild_id"]), latest_id)
-
-                    await asyncio.sleep(1.2)
-
-                except Exception:
-                    continue
-
-            await asyncio.sleep(self.poll_seconds)
-
-        @poll_task.before_loop
-        async def _before(self):
-            await self.bot.wait_until_ready()
+        # Only subs we can post to count: an unreachable one is never advanced, so letting it
+        # into the horizon (the oldest last_file_id, 0 if any sub has none yet) would pin the
+        # project to unconditional requests. Once it is reachable again it lowers the horizon
+        # and catches up on the latest file.
+        projects = []
+        for pid, subs in by_project.items():
+            live = [(sub, ch) for sub in subs if (ch := self._sub_channel(sub)) is not None]
+            if live:
+                horizon = min(int(sub.get("last_file_id") or 0) for sub, _ in live)
+                projects.append((pid, horizon, live))
+        results = await asyncio.gather(
+            *(self._poll_project(pid, horizon) for pid, horizon, _ in projects),
+            return_exceptions=True,
+        )
+        outbox: dict[int, list] = {}
+        validators = []
+        for (project_id, _, project_subs), res in zip(projects, results):
+            if not res or isinstance(res, BaseException):
+                continue
+            latest, project_name, v = res
+            validators.append(v)
+            try:
+                await self._queue_announcements(project_id, project_subs, latest, project_name, outbox)
+            except Exception:
+                continue
+
+        # Channels drain concurrently, each in order; discord.py handles per-channel rate limits.
+        sent = await asyncio.gather(*(self._drain(msgs) for msgs in outbox.values()))
+        updates = [u for batch in sent for u in batch]
+        update_last_file_ids(updates)
+        # Stored last: if a send failed, the sub stays behind the stored last_file_id and
+        # the next poll skips the conditional headers, so the file is retried, not lost.
+        for v in validators:
+            save_poll_validators(*v)
+
+    @poll_task.before_loop
+    async def _before(self):
+        await self.bot.wait_until_ready()
 
     #----------------Slash Commands------------------
 
     group = app_commands.Group(name="cf", description="CurseForge update notifications")
 
-    @group.command(name="Subscribe", description="Subscribe a channel to CurseForge file updates for a project.")
+    @group.command(name="subscribe", description="Subscribe a channel to CurseForge file updates for a project.")
     @app_commands.describe(project_id="CurseForge Project ID", channel="Channel to post in", mention="Optional role to mention (role or @everyone)")
     @app_commands.checks.has_permissions(manage_guild=True)
     async def cf_subscribe(self, interaction: discord.Interaction,
@@ -232,16 +490,16 @@ def add_or_update_sub(project_id: int, guild_id: int, channel_id: int, mention:
         if not self.api_key:
             await interaction.response.send_message("⚠️ Set `CURSEFORGE_API_KEY` in your environment first.", ephemeral=True)
             return
-        add_or_update_sub(project_id, integration.guild_id, channel.id, str(mention.id) if mention else None)
-        await integration.response.send_message(f"✅ Subscribed **{channel.mention}** to project **{project_id}**.", ephemeral=True)
+        add_or_update_sub(project_id, interaction.guild_id, channel.id, str(mention.id) if mention else None)
+        await interaction.response.send_message(f"✅ Subscribed **{channel.mention}** to project **{project_id}**.", ephemeral=True)
 
     @group.command(name="unsubscribe", description="Remove a CurseForge project subscription.")
     @app_commands.describe(project_id="CurseForge Project ID")
     @app_commands.checks.has_permissions(manage_guild=True)
     async def cf_unsubscribe(self, interaction: discord.Interaction, project_id:int):
         ok = remove_sub(project_id, interaction.guild_id)
-        await interaction.response.send_message("🗑️ Subscription removed." if ok else "ℹ️ No subscription for that project.", emphemeral=True)
-    
+        await interaction.response.send_message("🗑️ Subscription removed." if ok else "ℹ️ No subscription for that project.", ephemeral=True)
+
     @group.command(name="list", description="List current CurseForge subscriptions in this server.")
     async def cf_list(self, interaction: discord.Interaction):
         rows = list_subs(interaction.guild_id)
@@ -249,34 +507,31 @@ def add_or_update_sub(project_id: int, guild_id: int, channel_id: int, mention:
             await interaction.response.send_message("No CurseForge subscriptions in this server.", ephemeral=True)
             return
         lines = []
-        for r in rows:
-            m = r["mention"]
+        for project_id, channel_id, m in rows:
             mm = f"<@&{m}>" if m and str(m).isdigit() else (m or"—")
-            lines.append(f"• Project `{r['project_id']}` → <#{r['channel_id']}> — mention: {mm}")
-            await interaction.response.send_message("\n".join(lines), ephemeral=True)
+            lines.append(f"• Project `{project_id}` → <#{channel_id}> — mention: {mm}")
+        await interaction.response.send_message("\n".join(lines), ephemeral=True)
 
     @group.command(name="check", description="Immediately fetch and post the latest file for a project here.")
     @app_commands.describe(project_id="CurseForge Project ID")
     async def cf_check(self, interaction: discord.Interaction, project_id: int):
-        if not self.api_key:
+        if not self.api_key or self.session is None:
             await interaction.response.send_message("⚠️ Set `CURSEFORGE_API_KEY` in your environment first.", ephemeral=True)
             return
         await interaction.response.defer(ephemeral=True, thinking=True)
-        if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
-        latest = await fetch_latest_file(self.session, self.api_key, project_id)
+        _, latest, _, _ = await fetch_latest_file(self.session, project_id)
         if not latest:
-            await interaction.followup.send("No file found (or API error)." ephemeral=True)
+            await interaction.followup.send("No file found (or API error).", ephemeral=True)
             return
-        name = await fetch_project_name(self.session, self.api_key, project_id)
+        name = await self._cached_project_name(project_id, get_poll_row(project_id) or {})
         embed = build_status_embed(latest, project_id, name)
         project_url = f"https://www.curseforge.com/projects/{project_id}"
-        download_url = latest.get("download_url") or latest.get("fileUrl") or project_url
-        view = CFButtons(download_url, project_url)
+        download_url = latest.get("downloadUrl") or latest.get("fileUrl") or project_url
+        view = cf_buttons(download_url, project_url)
 
         await interaction.channel.send(embed=embed, view=view)
         await interaction.followup.send("Posted the latest file.", ephemeral=True)
 
 async def setup(bot:commands.Bot):
+    # The `cf` group is a cog attribute, so add_cog registers it on the tree.
     await bot.add_cog(CurseForgeUpdates(bot))
-    bot.tree.add_command(CurseForgeUpdates.group)
\ No newline at end of file
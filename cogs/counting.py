@@ -1,45 +1,84 @@
 # cogs/counting.py
 from __future__ import annotations
-import re, unicodedata
-from decimal import Decimal, InvalidOperation
+import re, asyncio, unicodedata
 from typing import Optional, Tuple
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
-from services.db import init, get_state, set_state, bump_user_count, top_counters, get_setting, set_setting
+from services.db import (
+    init, get_state, set_state, top_counters, set_setting, get_bool_setting,
+    get_counting_channel, record_good_count,
+)
 
 EXTREME_MAX_EXPONENT = 18
 MILESTONES = {69, 420, 777, 1000, 1337}
-NUM_TOKEN = re.compile(r"[-+]?((\d[\d,_\s]*)|(\d+(\.\d+)?(e[+-]?\d+)))$", re.IGNORECASE)
+_TOK_SPLIT = re.compile(r"[^\w\-\+\.,\s]")
+_STRIP_SEP = str.maketrans("", "", ",_ ")  # digit-group separators users type
+# A real count is at most ~20 digits; leave room for separators/exponents, drop paste-bombs early.
+_MAX_COUNT_LEN = 64
+_MAX_MESSAGE_LEN = 1024
 
 def get_extreme_mode(gid: int) -> bool:
-    return (get_setting(gid, "extreme_mode", "false") == "true")
+    return get_bool_setting(gid, "extreme_mode", False)
+
+def get_delete_wrong(gid: int) -> bool:
+    return get_bool_setting(gid, "delete_wrong", True)
+
+# str.translate table: every non-ASCII digit -> its ASCII digit; unmapped chars pass through.
+_DIGIT_TABLE = {
+    cp: str(unicodedata.digit(chr(cp)))
+    for cp in range(0x80, 0x110000) if chr(cp).isdigit()
+}
 
 def _normalize_unicode_digits(s: str) -> str:
-    return "".join(str(unicodedata.digit(ch)) if ch.isdigit() and not ('0' <= ch <= '9') else ch for ch in s)
+    if s.isascii():
+        return s
+    return s.translate(_DIGIT_TABLE)
+
+def _parse_scientific_int(s: str) -> Optional[int]:
+    """
+    Exact integer value of a decimal/scientific literal ("1.5e1", "2.0", "-3e2"), else None.
+    Same grammar Decimal accepts here, but pure int math: mantissa digits scaled by the exponent.
+    """
+    sign = 1
+    if s[:1] in "+-":
+        sign = -1 if s[0] == "-" else 1
+        s = s[1:]
+    mant, has_e, exp_s = s.partition("e")
+    exp = 0
+    if has_e:
+        exp_digits = exp_s[1:] if exp_s[:1] in "+-" else exp_s
+        if not (exp_digits.isascii() and exp_digits.isdigit()):
+            return None
+        exp = int(exp_s, 10)
+        if abs(exp) > EXTREME_MAX_EXPONENT:
+            return None
+    int_part, _, frac = mant.partition(".")
+    digits = int_part + frac
+    if not digits or not (digits.isascii() and digits.isdigit()):
+        return None
+    n = int(digits, 10)
+    scale = exp - len(frac)
+    if scale >= 0:
+        return sign * n * 10 ** scale
+    q, r = divmod(n, 10 ** -scale)
+    return sign * q if r == 0 else None
 
 def _try_parse_numeric_token(tok: str) -> Optional[int]:
-    tok = _normalize_unicode_digits(tok.strip())
+    tok = tok.strip()
+    # Fast path: plain ASCII integer ("42", "-7") — no normalisation, no Decimal.
+    if tok.isascii():
+        body = tok[1:] if tok.startswith("-") else tok
+        if body.isdigit():
+            return int(tok, 10)
+    tok = _normalize_unicode_digits(tok)
     if not tok or tok.startswith("+"):
         return None
-    clean = tok.replace(",", "").replace("_", "").replace(" ", "")
-    if any(c in clean.lower() for c in ("e", ".")):
-        try:
-            d = Decimal(clean)
-            if d == d.to_integral_value():
-                if "e" in clean.lower():
-                    try:
-                        exp = int(re.split(r"e", clean, flags=re.IGNORECASE)[1])
-                        if abs(exp) > EXTREME_MAX_EXPONENT:
-                            return None
-                    except Exception:
-                        return None
-                return int(d)
-            return None
-        except InvalidOperation:
-            return None
+    clean = tok.translate(_STRIP_SEP)
+    if "." in clean or "e" in clean or "E" in clean:
+        return _parse_scientific_int(clean.lower())
     if clean.lstrip("-").isdigit():
         try:
             return int(clean)
@@ -48,22 +87,35 @@ def _try_parse_numeric_token(tok: str) -> Optional[int]:
     return None
 
 def _is_power10_milestone(n: int) -> bool:
-    if n <= 0:
+    # d * 10**k with k >= 4: strip trailing zeros, a single digit must remain.
+    if n < 10000:
         return False
-    s = str(n)
-    return s[0] in "123456789" and set(s[1:]) == {"0"} and len(s) >= 5
+    while n % 10 == 0:
+        n //= 10
+    return n < 10
+
+# Every milestone in the extreme-mode range (d * 10**k, k = 4..18) as one hash lookup.
+_ALL_MILESTONES = frozenset(MILESTONES) | frozenset(d * 10**k for k in range(4, EXTREME_MAX_EXPONENT + 1) for d in range(1, 10))
+_MILESTONE_CEIL = 10 ** (EXTREME_MAX_EXPONENT + 1)
 
 def is_milestone(n: int) -> bool:
-    return n in MILESTONES or _is_power10_milestone(n)
+    if n < _MILESTONE_CEIL:
+        return n in _ALL_MILESTONES
+    return _is_power10_milestone(n)  # only reachable via admin /setcount beyond the range
 
 def parse_count_message(content: str, expected: int, extreme: bool) -> Optional[int]:
+    if len(content) > _MAX_MESSAGE_LEN:
+        return None
     text = content.strip()
     if not extreme:
+        if len(text) > _MAX_COUNT_LEN:
+            return None
         return _try_parse_numeric_token(text)
-    val = _try_parse_numeric_token(text)
-    if val is not None:
-        return val
-    tokens = [t for t in re.split(r"[^\w\-\+\.,\s]", text) if t]
+    if len(text) <= _MAX_COUNT_LEN:
+        val = _try_parse_numeric_token(text)
+        if val is not None:
+            return val
+    tokens = [t for t in _TOK_SPLIT.split(text) if t]
     for chunk in " ".join(tokens).split():
         if len(chunk) > 32:
             continue
@@ -72,26 +124,34 @@ def parse_count_message(content: str, expected: int, extreme: bool) -> Optional[
             return cand
     return None
 
+def _scan_history(batch: list[tuple[str, int]], extreme: bool) -> Optional[Tuple[int, int]]:
+    """First (newest) message in the batch that parses as a number: (value, author_id)."""
+    for content, author_id in batch:
+        val = parse_count_message(content, 0, extreme)
+        if val is not None:
+            return val, author_id
+    return None
+
+_BACKFILL_BATCH = 100  # one history page
+
 async def backfill_from_history(channel: discord.TextChannel, extreme: bool, max_messages: int = 5000) -> Tuple[int, Optional[int]]:
-    last_number = 0
-    last_user: Optional[int] = None
-    expected: Optional[int] = None
+    # The current count is the newest numeric message; older history can't change it,
+    # so stop paging at the first hit. Parsing runs in a worker thread per page.
+    batch: list[tuple[str, int]] = []
     async for msg in channel.history(limit=max_messages, oldest_first=False):
         if msg.author.bot:
             continue
-        val = parse_count_message(msg.content, expected or 0, extreme)
-        if val is None:
-            continue
-        if expected is None:
-            last_number = val
-            last_user = msg.author.id
-            expected = val - 1
-            continue
-        if val == expected:
-            expected -= 1
-            continue
-        break
-    return max(0, last_number), last_user
+        batch.append((msg.content, msg.author.id))
+        if len(batch) >= _BACKFILL_BATCH:
+            hit = await asyncio.to_thread(_scan_history, batch, extreme)
+            if hit:
+                return max(0, hit[0]), hit[1]
+            batch = []
+    if batch:
+        hit = await asyncio.to_thread(_scan_history, batch, extreme)
+        if hit:
+            return max(0, hit[0]), hit[1]
+    return 0, None
 
 class Counting(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -127,15 +187,15 @@ class Counting(commands.Cog):
         gid = interaction.guild.id
 
         st = get_state(gid)
-        nextn = (st["last_number"] or 0) + 1
-        high_user = f"<@{st['high_scorer_id']}>" if st.get("high_scorer_id") else "—"
+        nextn = (st.last_number or 0) + 1
+        high_user = f"<@{st.high_scorer_id}>" if st.high_scorer_id else "—"
         rows = top_counters(gid, 10)
         lb = "\n".join([f"{i+1}. <@{r['user_id']}> — {r['cnt']}" for i, r in enumerate(rows)]) or "(no data yet)"
         embed = discord.Embed(title="CelestiGuard Stats", color=discord.Color.blurple())
-        embed.add_field(name="Counting Channel", value=(f"<#{st['channel_id']}>" if st.get("channel_id") else "*not set*"), inline=True)
-        embed.add_field(name="Current Count", value=str(st["last_number"]), inline=True)
+        embed.add_field(name="Counting Channel", value=(f"<#{st.channel_id}>" if st.channel_id else "*not set*"), inline=True)
+        embed.add_field(name="Current Count", value=str(st.last_number), inline=True)
         embed.add_field(name="Next Number", value=str(nextn), inline=True)
-        embed.add_field(name="High Score", value=str(st["high_score"]), inline=True)
+        embed.add_field(name="High Score", value=str(st.high_score), inline=True)
         embed.add_field(name="Record Holder", value=high_user, inline=True)
         embed.add_field(name="Top Counters", value=lb, inline=False)
         await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -200,7 +260,7 @@ class Counting(commands.Cog):
         gid = interaction.guild.id
 
         st = get_state(gid)
-        cid = st.get("channel_id")
+        cid = st.channel_id
         if not cid:
             await interaction.response.send_message("Counting channel not set.", ephemeral=True)
             return
@@ -225,18 +285,17 @@ class Counting(commands.Cog):
             return
 
         gid = message.guild.id
-        st = get_state(gid)
-        ch_id = st.get("channel_id")
-        if not ch_id or message.channel.id != ch_id:
+        # One dict lookup + int compare for the (vast majority of) non-counting messages.
+        if get_counting_channel(gid) != message.channel.id:
             return
+        st = get_state(gid)
 
         extreme = get_extreme_mode(gid)
-        delete_wrong = (get_setting(gid, "delete_wrong", "true") == "true")
-        expected = (st["last_number"] or 0) + 1
+        expected = (st.last_number or 0) + 1
         n = parse_count_message(message.content, expected, extreme)
 
         if n is None:
-            if delete_wrong:
+            if get_delete_wrong(gid):
                 try:
                     await message.delete()
                 except Exception:
@@ -244,14 +303,14 @@ class Counting(commands.Cog):
             return
 
         reason = None
-        same_user = (st.get("last_user_id") == message.author.id)
+        same_user = (st.last_user_id == message.author.id)
         if n != expected:
             reason = f"Expected **{expected}**."
         elif same_user and not (extreme and is_milestone(n)):
             reason = "You can't count twice in a row."
 
         if reason:
-            if delete_wrong:
+            if get_delete_wrong(gid):
                 try:
                     await message.delete()
                 except Exception:
@@ -266,24 +325,13 @@ class Counting(commands.Cog):
             set_state(gid, last_number=0, last_user_id=None)
             return
 
-        # Good number
-        hs = st.get("high_score", 0)
-        hi = st.get("high_scorer_id")
-        if n > hs:
-            hs = n
-            hi = message.author.id
-            try:
-                await message.add_reaction("🏆")
-            except Exception:
-                pass
-        else:
-            try:
-                await message.add_reaction("✅")
-            except Exception:
-                pass
-
-        set_state(gid, last_number=n, last_user_id=message.author.id, high_score=hs, high_scorer_id=hi)
-        bump_user_count(gid, message.author.id)
+        # Good number: persist before awaiting the reaction so the next message sees it.
+        new_record = n > st.high_score
+        record_good_count(gid, n, message.author.id, new_record)
+        try:
+            await message.add_reaction("🏆" if new_record else "✅")
+        except Exception:
+            pass
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Counting(bot))
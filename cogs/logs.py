@@ -6,7 +6,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from services.db import get_setting, set_setting
+from services.db import aset_setting, aget_settings_for_key
 
 # ---------- helpers: safe channel formatting / sending ----------
 
@@ -20,24 +20,40 @@ TextSendable: TypeAlias = Union[
     discord.GroupChannel,
 ]
 
+def _fmt_thread(ch: discord.Thread) -> str:
+    base = f"#{ch.name}" if getattr(ch, "name", None) else f"Thread:{ch.id}"
+    return f"{base} (thread)"
+
+def _fmt_dm(ch: discord.DMChannel) -> str:
+    u = ch.recipient
+    uname = f"{u} ({u.id})" if u else "unknown user"
+    return f"DM with {uname}"
+
+def _fmt_group(ch: discord.GroupChannel) -> str:
+    return f"Group DM '{ch.name or 'unnamed'}' ({len(ch.recipients)} members)"
+
+# Exact-type dispatch; one dict lookup instead of an isinstance ladder per event.
+_FORMATTERS = {
+    discord.TextChannel: lambda ch: ch.mention,
+    discord.Thread: _fmt_thread,
+    discord.ForumChannel: lambda ch: f"{ch.name} (forum)",
+    discord.CategoryChannel: lambda ch: f"{ch.name} (category)",
+    discord.DMChannel: _fmt_dm,
+    discord.GroupChannel: _fmt_group,
+}
+
 def format_channel_ref(ch: discord.abc.GuildChannel | discord.abc.PrivateChannel) -> str:
     """Return a safe, readable channel reference for logs (no .mention on DM/Group)."""
-    if isinstance(ch, discord.TextChannel):
-        return ch.mention
-    if isinstance(ch, discord.Thread):
-        base = f"#{ch.name}" if getattr(ch, "name", None) else f"Thread:{ch.id}"
-        return f"{base} (thread)"
-    if isinstance(ch, discord.ForumChannel):
-        return f"{ch.name} (forum)"
-    if isinstance(ch, discord.CategoryChannel):
-        return f"{ch.name} (category)"
-    if isinstance(ch, discord.DMChannel):
-        u = ch.recipient
-        uname = f"{u} ({u.id})" if u else "unknown user"
-        return f"DM with {uname}"
-    if isinstance(ch, discord.GroupChannel):
-        return f"Group DM '{ch.name or 'unnamed'}' ({len(ch.recipients)} members)"
-    return f"{type(ch).__name__} {getattr(ch, 'id', '?')}"
+    fn = _FORMATTERS.get(type(ch))
+    if fn is None:
+        # Subclasses (rare) still get their base type's formatter.
+        for klass, f in _FORMATTERS.items():
+            if isinstance(ch, klass):
+                fn = _FORMATTERS[type(ch)] = f
+                break
+        else:
+            return f"{type(ch).__name__} {getattr(ch, 'id', '?')}"
+    return fn(ch)
 
 async def try_send(dest: TextSendable, *, embed: Optional[discord.Embed] = None, content: Optional[str] = None):
     """
@@ -54,19 +70,8 @@ async def try_send(dest: TextSendable, *, embed: Optional[discord.Embed] = None,
     except Exception:
         pass
 
-def get_log_channel(guild: discord.Guild) -> Optional[TextSendable]:
-    """
-    Fetch the configured log channel from DB (key: 'log_channel_id').
-    Return ONLY a sendable channel type (TextChannel/Thread/DM/Group), else None.
-    """
-    cid_str = get_setting(guild.id, "log_channel_id", None)
-    if not cid_str:
-        return None
-    try:
-        cid = int(cid_str)
-    except ValueError:
-        return None
-
+def resolve_log_channel(guild: discord.Guild, cid: int) -> Optional[TextSendable]:
+    """Cache-only lookup of a log channel id; returns a guild text channel/thread or None."""
     ch = guild.get_channel(cid)
     if isinstance(ch, (discord.TextChannel, discord.Thread)):
         return ch
@@ -74,7 +79,7 @@ def get_log_channel(guild: discord.Guild) -> Optional[TextSendable]:
     # Not a Guild text/thread; never DM/Group from guild lookup.
     # If you ever store a thread id and it isn't cached, you could fetch here:
     # try:
-    #     fetched = await guild.fetch_channel(cid)  # would need to make this async
+    #     fetched = await guild.fetch_channel(cid)
     #     if isinstance(fetched, (discord.TextChannel, discord.Thread)):
     #         return fetched
     # except Exception:
@@ -88,6 +93,23 @@ def get_log_channel(guild: discord.Guild) -> Optional[TextSendable]:
 class Logs(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # guild_id -> log channel id, loaded once; guilds without an entry return immediately.
+        self._log_channels: dict[int, int] = {}
+
+    async def cog_load(self):
+        channels: dict[int, int] = {}
+        for gid, value in (await aget_settings_for_key("log_channel_id")).items():
+            try:
+                channels[gid] = int(value)
+            except (TypeError, ValueError):
+                continue
+        self._log_channels = channels
+
+    def _log_dest(self, guild: discord.Guild) -> Optional[TextSendable]:
+        cid = self._log_channels.get(guild.id)
+        if cid is None:
+            return None
+        return resolve_log_channel(guild, cid)
 
     # Slash command to set the log channel
     @app_commands.command(description="Set the channel where CelestiGuard will post moderation logs")
@@ -97,7 +119,8 @@ class Logs(commands.Cog):
         if interaction.guild is None:
             await interaction.response.send_message("Use this in a server.", ephemeral=True)
             return
-        set_setting(interaction.guild.id, "log_channel_id", str(channel.id))
+        await aset_setting(interaction.guild.id, "log_channel_id", str(channel.id))
+        self._log_channels[interaction.guild.id] = channel.id
         await interaction.response.send_message(f"✅ Log channel set to {channel.mention}", ephemeral=True)
 
     # Role changes: on_member_update
@@ -108,19 +131,22 @@ class Logs(commands.Cog):
         if guild is None:
             return
 
-        # Compare roles
-        before_set = set(before.roles)
-        after_set = set(after.roles)
-        added = [r for r in (after_set - before_set) if r.name != "@everyone"]
-        removed = [r for r in (before_set - after_set) if r.name != "@everyone"]
+        dest = self._log_dest(guild)
+        if dest is None:
+            return  # not configured
+
+        # Compare roles by ID (cheap int hashing; @everyone's role id == guild.id).
+        # Keep the Role objects we already have so no guild.get_role lookups are needed,
+        # which also keeps roles that were removed because they were deleted.
+        everyone_id = guild.id
+        before_roles = {r.id: r for r in before.roles}
+        after_roles = {r.id: r for r in after.roles}
+        added = [after_roles[i] for i in after_roles.keys() - before_roles.keys() if i != everyone_id]
+        removed = [before_roles[i] for i in before_roles.keys() - after_roles.keys() if i != everyone_id]
 
         if not added and not removed:
             return
 
-        dest = get_log_channel(guild)
-        if dest is None:
-            return  # not configured
-
         emb = discord.Embed(color=discord.Color.blurple(), title="Role Update")
         emb.set_author(name=str(after), icon_url=after.display_avatar.url)
         emb.add_field(name="User", value=f"{after.mention} (`{after.id}`)", inline=False)
@@ -146,7 +172,7 @@ class Logs(commands.Cog):
         guild = getattr(channel, "guild", None)
         if guild is None:
             return
-        dest = get_log_channel(guild)
+        dest = self._log_dest(guild)
         if dest is None:
             return
         emb = discord.Embed(color=discord.Color.green(), title="Channel Created")
@@ -158,7 +184,7 @@ class Logs(commands.Cog):
         guild = getattr(channel, "guild", None)
         if guild is None:
             return
-        dest = get_log_channel(guild)
+        dest = self._log_dest(guild)
         if dest is None:
             return
         emb = discord.Embed(color=discord.Color.red(), title="Channel Deleted")
@@ -170,7 +196,7 @@ class Logs(commands.Cog):
         guild = getattr(after, "guild", None)
         if guild is None:
             return
-        dest = get_log_channel(guild)
+        dest = self._log_dest(guild)
         if dest is None:
             return
 
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import time
+from collections import OrderedDict
 from typing import Optional, Tuple
 
 import discord
@@ -8,7 +10,7 @@ from discord.ext import commands
 
 # These helpers are assumed to exist in services.db in your project
 # (they showed up in your Pylance hints). They must accept `int` guild IDs.
-from services.db import add_case, list_cases  # type: ignore[reportMissingImports]
+from services.db import alist_cases, queue_case  # type: ignore[reportMissingImports]
 
 
 def _ensure_guild(inter: discord.Interaction) -> Tuple[discord.Guild, int]:
@@ -22,11 +24,37 @@ def _ensure_guild(inter: discord.Interaction) -> Tuple[discord.Guild, int]:
     return inter.guild, int(inter.guild_id)
 
 
+CASES_CACHE_TTL = 5  # seconds
+CASES_CACHE_MAX = 512
+_BLURPLE = discord.Color.blurple()
+
+
 class Moderation(commands.Cog):
     """Basic moderation commands (ban / unban / cases list)."""
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # (guild_id, limit) -> (fetched_at, rows); dropped for a guild whenever we add a case there.
+        self._cases_cache: "OrderedDict[tuple[int, int], tuple[float, tuple[dict, ...]]]" = OrderedDict()
+
+    async def _cached_list_cases(self, gid: int, lim: int) -> tuple[dict, ...]:
+        """Recent cases for /cases: memory first (short TTL), then the DB."""
+        key = (gid, lim)
+        now = time.monotonic()
+        hit = self._cases_cache.get(key)
+        if hit and now - hit[0] < CASES_CACHE_TTL:
+            self._cases_cache.move_to_end(key)
+            return hit[1]
+        rows = tuple(dict(r) for r in await alist_cases(guild_id=gid, limit=lim))
+        self._cases_cache[key] = (now, rows)
+        self._cases_cache.move_to_end(key)
+        if len(self._cases_cache) > CASES_CACHE_MAX:
+            self._cases_cache.popitem(last=False)
+        return rows
+
+    def _invalidate_cases(self, gid: int) -> None:
+        for key in [k for k in self._cases_cache if k[0] == gid]:
+            del self._cases_cache[key]
 
     # --- /ban ---
     @app_commands.command(description="Ban a member (requires Ban Members).")
@@ -41,20 +69,15 @@ class Moderation(commands.Cog):
         inter: discord.Interaction,
         member: discord.Member,
         reason: Optional[str] = None,
-        delete_message_seconds: Optional[int] = None,
+        delete_message_seconds: app_commands.Range[int, 0, 604800] = 0,
     ):
         guild, gid = _ensure_guild(inter)
 
-        # Clamp delete_message_seconds to allowed API range (0..604800)
-        dms = 0
-        if isinstance(delete_message_seconds, int):
-            dms = max(0, min(604800, delete_message_seconds))
-
         await inter.response.defer(ephemeral=True, thinking=True)
 
         # Perform the ban
         try:
-            await guild.ban(member, reason=reason or discord.utils.MISSING, delete_message_seconds=dms)
+            await guild.ban(member, reason=reason or discord.utils.MISSING, delete_message_seconds=delete_message_seconds)
         except discord.Forbidden:
             await inter.followup.send("I don't have permission to ban that member.", ephemeral=True)
             return
@@ -64,7 +87,7 @@ class Moderation(commands.Cog):
 
         # Log the case in DB with a concrete int guild_id
         try:
-            add_case(
+            queue_case(
                 guild_id=gid,
                 action="BAN",
                 user_id=int(member.id),
@@ -74,6 +97,7 @@ class Moderation(commands.Cog):
         except Exception:
             # Non-fatal: still consider command successful
             pass
+        self._invalidate_cases(gid)
 
         await inter.followup.send(f"🔨 Banned **{member}**. {'Reason: ' + reason if reason else ''}", ephemeral=True)
 
@@ -86,15 +110,8 @@ class Moderation(commands.Cog):
 
         await inter.response.defer(ephemeral=True, thinking=True)
 
-        # Fetch a discord.User object for unban
-        try:
-            user = await self.bot.fetch_user(int(user_id))
-        except discord.NotFound:
-            await inter.followup.send("User not found.", ephemeral=True)
-            return
-        except discord.HTTPException as e:
-            await inter.followup.send(f"Discord error while fetching user: {e}", ephemeral=True)
-            return
+        # guild.unban only needs the ID; no /users/{id} round-trip.
+        user = discord.Object(id=int(user_id))
 
         try:
             await guild.unban(user, reason=reason or discord.utils.MISSING)
@@ -110,7 +127,7 @@ class Moderation(commands.Cog):
 
         # Log the case
         try:
-            add_case(
+            queue_case(
                 guild_id=gid,
                 action="UNBAN",
                 user_id=int(user.id),
@@ -119,21 +136,23 @@ class Moderation(commands.Cog):
             )
         except Exception:
             pass
+        self._invalidate_cases(gid)
 
-        await inter.followup.send(f"✅ Unbanned **{user}**.", ephemeral=True)
+        # Name from the client cache if we have it; otherwise just the ID.
+        cached = self.bot.get_user(user.id)
+        await inter.followup.send(f"✅ Unbanned **{cached or user.id}**.", ephemeral=True)
 
     # --- /cases ---
     @app_commands.command(description="List recent moderation cases.")
     @app_commands.checks.has_permissions(moderate_members=True)
     @app_commands.describe(limit="How many cases to show (default 10)")
-    async def cases(self, inter: discord.Interaction, limit: Optional[int] = 10):
+    async def cases(self, inter: discord.Interaction, limit: app_commands.Range[int, 1, 50] = 10):
         _, gid = _ensure_guild(inter)
-        lim = 10 if limit is None else max(1, min(50, int(limit)))  # keep it sane
 
         await inter.response.defer(ephemeral=True, thinking=True)
 
         try:
-            rows = list_cases(guild_id=gid, limit=lim)
+            rows = await self._cached_list_cases(gid, limit)
         except Exception as e:
             await inter.followup.send(f"DB error while fetching cases: {e}", ephemeral=True)
             return
@@ -142,17 +161,17 @@ class Moderation(commands.Cog):
             await inter.followup.send("No cases recorded yet.", ephemeral=True)
             return
 
-        embed = discord.Embed(title=f"Last {len(rows)} cases", color=discord.Color.blurple())
-        for r in rows:
-            action = r.get("action", "?")
-            target = r.get("target_id")
-            mod = r.get("moderator_id")
-            rsn = r.get("reason") or ""
-            embed.add_field(
-                name=f"{action}",
-                value=f"Target: <@{target}> (`{target}`)\nBy: <@{mod}> (`{mod}`)\n{('Reason: ' + rsn) if rsn else ''}",
-                inline=False,
-            )
+        # One description line per case instead of a field each (25-field embed cap, less churn).
+        desc = "\n".join(
+            f"**{r.get('action', '?')}** — <@{r.get('user_id')}> (`{r.get('user_id')}`) by <@{r.get('moderator_id')}>"
+            + (f" — {r['reason']}" if r.get("reason") else "")
+            for r in rows
+        )
+        embed = discord.Embed(
+            title=f"Last {len(rows)} cases",
+            description=desc[:4096],
+            color=_BLURPLE,
+        )
 
         await inter.followup.send(embed=embed, ephemeral=True)
 
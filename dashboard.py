@@ -2,13 +2,15 @@
 from __future__ import annotations
 
 import os
+import re
 import json
 import secrets
 import time
 import asyncio
-import threading
 import logging
+import mimetypes
 import sqlite3
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
 from typing import Any, List
@@ -17,13 +19,29 @@ import httpx
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.templating import Jinja2Templates
-from urllib.parse import urlencode
+from urllib.parse import quote, urlencode
+
+try:  # optional: faster encoder that emits bytes directly
+    import orjson
+    _json_dumps_bytes = orjson.dumps
+except ImportError:
+    def _json_dumps_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
 
 APP_TITLE = "CelestiGuard Dashboard"
 VERSION = os.getenv("CELESTIGUARD_VERSION", "dev")
 
-app = FastAPI(title=APP_TITLE)
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    yield
+    if _http is not None:
+        await _http.aclose()
+
+app = FastAPI(title=APP_TITLE, lifespan=_lifespan)
+# Compress HTML/JSON bodies (the changelog is polled uncached); adds Vary: Accept-Encoding.
+app.add_middleware(GZipMiddleware, minimum_size=512)
 
 # Basic logger
 logging.basicConfig(level=logging.INFO)
@@ -34,11 +52,73 @@ BASE_DIR = Path(__file__).resolve().parent
 templates_dir = BASE_DIR / "templates"
 static_dir = BASE_DIR / "static"
 
+_HASHED_ASSET = re.compile(r"\.[0-9a-f]{8,}\.")
+_MEM_ASSET_MAX = 256 * 1024  # files up to this size are served from memory
+
+def _static_cache_control(url_path: str) -> str:
+    if _HASHED_ASSET.search(url_path):
+        return "public, max-age=31536000, immutable"
+    return "no-cache, must-revalidate"
+
+class CachedStaticFiles(StaticFiles):
+    """
+    Fingerprinted assets (name.<hash>.ext) are cached forever; everything else revalidates via ETag.
+    Small files are served from memory, keyed on (mtime_ns, size) so an edit on disk is picked up
+    on the next request; larger ones go through StaticFiles.
+    """
+    def __init__(self, *, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self._root = Path(directory)
+        # normalized relative path -> ((mtime_ns, size), body, media type, etag)
+        self._mem: dict[str, tuple[tuple[int, int], bytes, str, str]] = {}
+        for f in self._root.rglob("*"):
+            if f.is_file():
+                self._load(os.path.normpath(f.relative_to(self._root).as_posix()))
+
+    def _load(self, key: str):
+        """(Re)read one small file into memory; returns its entry, or None to defer to StaticFiles."""
+        f = self._root / key
+        try:
+            st = f.stat()
+            body = f.read_bytes() if st.st_size <= _MEM_ASSET_MAX else None
+        except OSError:
+            body = None
+        if body is None:
+            self._mem.pop(key, None)
+            return None
+        media_type = mimetypes.guess_type(f.name)[0] or "text/plain"
+        version = (st.st_mtime_ns, st.st_size)
+        entry = self._mem[key] = (version, body, media_type, f'W/"{version[0]:x}-{version[1]:x}"')
+        return entry
+
+    async def get_response(self, path: str, scope) -> Response:
+        hit = self._mem.get(path)
+        if hit is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+        try:
+            st = os.stat(self._root / path)
+        except OSError:
+            st = None
+        if st is None or (st.st_mtime_ns, st.st_size) != hit[0]:
+            hit = self._load(path)
+            if hit is None:
+                return await super().get_response(path, scope)
+        _, body, media_type, etag = hit
+        headers = {"ETag": etag, "Cache-Control": _static_cache_control(scope["path"])}
+        if _etag_matches(Request(scope), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type=media_type, headers=headers)
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        resp = super().file_response(full_path, stat_result, scope, status_code)
+        resp.headers["Cache-Control"] = _static_cache_control(scope["path"])
+        return resp
+
 if static_dir.is_dir():
-    app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+    app.mount("/static", CachedStaticFiles(directory=str(static_dir)), name="static")
 elif templates_dir.is_dir():
     # Legacy assets might live in templates/
-    app.mount("/static", StaticFiles(directory=str(templates_dir)), name="static")
+    app.mount("/static", CachedStaticFiles(directory=str(templates_dir)), name="static")
 
 templates = Jinja2Templates(directory=str(templates_dir)) if templates_dir.is_dir() else None
 
@@ -47,7 +127,27 @@ DATA_DIR = BASE_DIR / "data"
 DATA_DIR.mkdir(exist_ok=True)
 OAUTH_DB_PATH = DATA_DIR / "oauth_cache.db"
 
+# Rows only need to outlive a code/state's validity (minutes); keep a day, then sweep.
+_OAUTH_ROW_TTL = 86400
+_OAUTH_PRUNE_EVERY = 3600
+_oauth_conn: sqlite3.Connection | None = None
+_oauth_pruned_at = 0.0
+
 def _oauth_db():
+    """One connection per process (opened, migrated and pruned lazily) instead of one per call."""
+    global _oauth_conn, _oauth_pruned_at
+    conn = _oauth_conn
+    if conn is None:
+        conn = _oauth_conn = _open_oauth_db()
+    now = time.time()
+    if now - _oauth_pruned_at > _OAUTH_PRUNE_EVERY:
+        _oauth_pruned_at = now
+        with conn:
+            conn.execute("DELETE FROM used_states WHERE ts < ?", (int(now) - _OAUTH_ROW_TTL,))
+            conn.execute("DELETE FROM used_codes WHERE ts < ?", (int(now) - _OAUTH_ROW_TTL,))
+    return conn
+
+def _open_oauth_db() -> sqlite3.Connection:
     conn = sqlite3.connect(str(OAUTH_DB_PATH), check_same_thread=False)
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("""
@@ -94,12 +194,59 @@ def _find_changelog_path() -> Path | None:
             return p
     return None
 
-def _no_store_headers() -> dict[str, str]:
+# Resolved once; only searched for again while missing (or after it disappears).
+_changelog_path: Path | None = _find_changelog_path()
+# ((path, mtime_ns, size), etag, serialized list); the file is only re-read when it changes on disk.
+_changelog_cache: tuple[tuple[Path, int, int], str, bytes] | None = None
+_EMPTY_CHANGELOG = ('W/"empty"', b"[]")
+
+def _changelog_body() -> tuple[str, bytes]:
+    """(etag, JSON list body) for the changelog, parsed and serialized once per file version."""
+    global _changelog_cache, _changelog_path
+    p = _changelog_path
+    if p is None:
+        p = _changelog_path = _find_changelog_path()
+        if p is None:
+            return _EMPTY_CHANGELOG
+    try:
+        st = p.stat()
+    except OSError:
+        _changelog_path = None
+        return _EMPTY_CHANGELOG
+    # Size as well as mtime: catches rewrites within the filesystem's timestamp granularity.
+    key = (p, st.st_mtime_ns, st.st_size)
+    cached = _changelog_cache
+    if cached is not None and cached[0] == key:
+        return cached[1], cached[2]
+
+    items: List[Any] = []
+    try:
+        with p.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            items = [data]
+        elif isinstance(data, list):
+            items = data
+    except Exception:
+        items = []
+    body = _json_dumps_bytes(items)
+    etag = f'W/"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    _changelog_cache = (key, etag, body)
+    return etag, body
+
+def _revalidate_headers(etag: str) -> dict[str, str]:
+    # Browsers may keep a copy but must check it every time; unchanged files cost a 304.
     return {
-        "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-        "Pragma": "no-cache",
+        "Cache-Control": "private, max-age=0, must-revalidate",
+        "ETag": etag,
     }
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    return inm.strip() == "*" or etag in (t.strip() for t in inm.split(","))
+
 # --- Health & Version ---
 @app.get("/health")
 async def health():
@@ -107,7 +254,7 @@ async def health():
 
 # Allow HEAD / so probes don’t get 405
 @app.head("/")
-def home_head():
+async def home_head():
     return Response(status_code=200)
 
 @app.get("/api/version")
@@ -116,49 +263,20 @@ async def api_version():
 
 # --- API endpoint for changelog ---
 @app.get("/api/changelog")
-async def api_changelog():
+async def api_changelog(request: Request):
     """
-    Always return a JSON LIST (possibly empty) and disable caching so the page
-    never gets stuck on stale responses.
+    Always return a JSON LIST (possibly empty). Clients must revalidate every time
+    (ETag + 304), so the page never gets stuck on stale responses.
     """
-    p = _find_changelog_path()
-    items: List[Any] = []
-    if p:
-        try:
-            with p.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-            if isinstance(data, dict):
-                items = [data]
-            elif isinstance(data, list):
-                items = data
-            else:
-                items = []
-        except Exception:
-            items = []
-    return JSONResponse(items, headers=_no_store_headers())
+    etag, body = _changelog_body()
+    headers = _revalidate_headers(etag)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 # --- Webpage route ---
-@app.get("/", response_class=HTMLResponse)
-async def home(request: Request):
-    """
-    Renders index.html if templates/ exists, otherwise serves a tiny inline page
-    that fetches /api/changelog and shows it.
-    """
-    if templates:
-        resp = templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "title": APP_TITLE,
-                "version": VERSION,
-            },
-        )
-        # Debug header to quickly see if the browser sent a session
-        resp.headers["X-Debug-Session"] = "present" if request.cookies.get("session") else "absent"
-        return resp
-
-    # Fallback minimal HTML if Jinja templates aren't available
-    html = f"""
+# Inline page used when templates/ is missing; title/version are fixed at startup, so render once.
+_FALLBACK_HTML = f"""
     <!doctype html>
     <html>
       <head>
@@ -180,7 +298,7 @@ async def home(request: Request):
           (async function() {{
             const el = document.getElementById('cl');
             try {{
-              const res = await fetch('/api/changelog', {{ cache: 'no-store', headers: {{ 'Cache-Control': 'no-store' }} }});
+              const res = await fetch('/api/changelog', {{ cache: 'no-cache' }});
               if (!res.ok) throw new Error('HTTP ' + res.status);
               const items = await res.json();
               if (!Array.isArray(items) || !items.length) {{
@@ -205,17 +323,46 @@ async def home(request: Request):
         </script>
       </body>
     </html>
+    """.encode("utf-8")
+
+_index_html: bytes | None = None
+
+@app.get("/", response_class=HTMLResponse)
+async def home(request: Request):
+    """
+    Renders index.html if templates/ exists, otherwise serves a tiny inline page
+    that fetches /api/changelog and shows it.
     """
-    return HTMLResponse(html)
+    global _index_html
+    if templates:
+        # The page only uses title/version (fixed at startup), so Jinja runs once.
+        if _index_html is None:
+            _index_html = templates.get_template("index.html").render(
+                title=APP_TITLE,
+                version=VERSION,
+            ).encode("utf-8")
+        resp = HTMLResponse(_index_html)
+        # Debug header to quickly see if the browser sent a session
+        resp.headers["X-Debug-Session"] = "present" if request.cookies.get("session") else "absent"
+        return resp
+
+    # Fallback minimal HTML if Jinja templates aren't available
+    return Response(content=_FALLBACK_HTML, media_type="text/html; charset=utf-8")
 
 # --- Small niceties to reduce log noise ---
+# Fresh Response per call (middleware mutates header lists), but constant bodies/headers
+# and long max-age so browsers and crawlers stop re-requesting.
+_ROBOTS_TXT = b"User-agent: *\nDisallow:\n"
+_FAVICON_HEADERS = {"Cache-Control": "public, max-age=604800"}
+_ROBOTS_HEADERS = {"Cache-Control": "public, max-age=86400"}
+
 @app.get("/favicon.ico")
-def favicon():
-    return Response(status_code=204)
+async def favicon():
+    return Response(status_code=204, headers=_FAVICON_HEADERS)
 
 @app.get("/robots.txt", response_class=HTMLResponse)
-def robots():
-    return HTMLResponse("User-agent: *\nDisallow:\n", media_type="text/plain")
+async def robots():
+    return Response(_ROBOTS_TXT, media_type="text/plain", headers=_ROBOTS_HEADERS)
 
 # --- OAuth (Discord) ---
 DISCORD_AUTH   = "https://discord.com/api/oauth2/authorize"
@@ -228,13 +375,34 @@ SCOPES         = ["identify", "guilds"]
 # still keep light in-memory checks (good fast path), but persistence is the fence
 _used_states_mem: dict[str, float] = {}
 _used_codes_mem: dict[str, float] = {}
-_code_lock = threading.Lock()
+_USED_MEM_TTL = 600   # seconds; codes/states are long dead by then
+_USED_MEM_MAX = 1024
+
+def _remember_used(mem: dict[str, float], key: str) -> None:
+    """Record key and trim: insertion order is time order, so stale entries sit at the front."""
+    now = time.time()
+    mem[key] = now
+    cutoff = now - _USED_MEM_TTL
+    while mem:
+        oldest = next(iter(mem))
+        if mem[oldest] > cutoff and len(mem) <= _USED_MEM_MAX:
+            break
+        del mem[oldest]
 
 # Optional: cookie domain override (leave empty to omit)
 COOKIE_DOMAIN = os.getenv("COOKIE_DOMAIN", "").strip() or None
 
+# Everything but the state is fixed at startup, so encode it once.
+_AUTH_URL_PREFIX = f"{DISCORD_AUTH}?" + urlencode({
+    "response_type": "code",
+    "client_id": CLIENT_ID,
+    "redirect_uri": REDIRECT_URI,
+    "scope": " ".join(SCOPES),
+    "prompt": "none",  # or "consent"
+}) + "&state="
+
 @app.get("/auth/login")
-def auth_login(request: Request):
+async def auth_login(request: Request):
     # HARD STOP: if a session already exists, don't start a new OAuth flow
     if request.cookies.get("session"):
         resp = RedirectResponse("/", status_code=303)
@@ -242,15 +410,7 @@ def auth_login(request: Request):
         return resp
 
     state = secrets.token_urlsafe(24)
-    params = {
-        "response_type": "code",
-        "client_id": CLIENT_ID,
-        "redirect_uri": REDIRECT_URI,
-        "scope": " ".join(SCOPES),
-        "state": state,
-        "prompt": "none",  # or "consent"
-    }
-    url = f"{DISCORD_AUTH}?{urlencode(params)}"
+    url = _AUTH_URL_PREFIX + quote(state, safe="")
     log.info("auth_login -> redirecting to Discord | state=%s", state)
     resp = RedirectResponse(url, status_code=302)
     resp.set_cookie(
@@ -262,24 +422,34 @@ def auth_login(request: Request):
     resp.headers["X-Debug-State"] = state
     return resp
 
+# Shared across callbacks (and retries) so the TCP/TLS connection to discord.com is reused.
+_http: httpx.AsyncClient | None = None
+
+def _http_client() -> httpx.AsyncClient:
+    global _http
+    if _http is None or _http.is_closed:
+        _http = httpx.AsyncClient(timeout=10, limits=httpx.Limits(max_keepalive_connections=10))
+    return _http
+
+# Fixed part of the token-exchange form; only code/redirect_uri vary per call.
+_TOKEN_FORM_BASE = {
+    "client_id": CLIENT_ID,
+    "client_secret": CLIENT_SECRET,
+    "grant_type": "authorization_code",
+}
+_TOKEN_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
 async def exchange_code_for_token(code: str, redirect_uri: str) -> dict:
     """Exchange authorization code for tokens. Retries a few times on rate limit."""
-    data = {
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
-        "grant_type": "authorization_code",
-        "code": code,
-        "redirect_uri": redirect_uri,
-    }
+    data = {**_TOKEN_FORM_BASE, "code": code, "redirect_uri": redirect_uri}
     attempts = 0
     while True:
         attempts += 1
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.post(
-                DISCORD_TOKEN,
-                data=data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-            )
+        resp = await _http_client().post(
+            DISCORD_TOKEN,
+            data=data,
+            headers=_TOKEN_HEADERS,
+        )
         if resp.status_code == 200:
             return resp.json()
         # Basic backoff on rate limit (Discord sometimes replies 429 or 400 w/ rate-limit phrasing)
@@ -317,13 +487,14 @@ async def auth_callback(request: Request, code: str | None = None, state: str |
         resp.headers["X-Debug-Stage"] = "auth/callback-already-used-mem"
         return resp
 
-    with _code_lock:
-        if code in _used_codes_mem:
-            log.info("auth_callback -> code already used (mem) | code=%s", code[:8])
-            resp = RedirectResponse("/", status_code=303)
-            resp.delete_cookie("oauth_state", path="/", domain=COOKIE_DOMAIN)
-            resp.headers["X-Debug-Stage"] = "auth/callback-code-reused-mem"
-            return resp
+    # No lock needed: nothing from here to _remember_used() awaits, so the
+    # check-and-mark runs atomically on the event loop.
+    if code in _used_codes_mem:
+        log.info("auth_callback -> code already used (mem) | code=%s", code[:8])
+        resp = RedirectResponse("/", status_code=303)
+        resp.delete_cookie("oauth_state", path="/", domain=COOKIE_DOMAIN)
+        resp.headers["X-Debug-Stage"] = "auth/callback-code-reused-mem"
+        return resp
 
     # Durable, cross-worker idempotency (SQLite)
     if not mark_state_used_once(state):
@@ -341,8 +512,8 @@ async def auth_callback(request: Request, code: str | None = None, state: str |
         return resp
 
     # Mark memory maps once we've passed the DB fence
-    _used_states_mem[state] = time.time()
-    _used_codes_mem[code] = time.time()
+    _remember_used(_used_states_mem, state)
+    _remember_used(_used_codes_mem, code)
 
     log.info("auth_callback -> exchanging code once | code=%s state=%s", code[:8], state)
     try:
@@ -373,7 +544,7 @@ async def auth_callback(request: Request, code: str | None = None, state: str |
 
 # --- Debug: see what cookies the browser is actually sending ---
 @app.get("/debug/session")
-def debug_session(request: Request):
+async def debug_session(request: Request):
     return JSONResponse({
         "time": datetime.utcnow().isoformat() + "Z",
         "has_session": bool(request.cookies.get("session")),
@@ -1,21 +1,92 @@
 import os
 import time
+import atexit
+import asyncio
 import sqlite3
-from contextlib import closing
-from typing import Optional
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple, Optional
 
 # --- DB file under ./data ---
 os.makedirs("data", exist_ok=True)
 DB_PATH = os.path.join("data", "celestiguard.db")
 
-def get_conn():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    return conn
+# One connection for the whole process; the lock serializes access to it.
+_CONN: Optional[sqlite3.Connection] = None
+_LOCK = threading.RLock()
+
+def get_conn() -> sqlite3.Connection:
+    """Return the shared connection, opening it (and running PRAGMAs) on first use."""
+    global _CONN
+    if _CONN is None:
+        with _LOCK:
+            if _CONN is None:
+                conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+                conn.row_factory = sqlite3.Row
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")     # fsync at checkpoints, not every commit
+                conn.execute("PRAGMA temp_store=MEMORY")
+                conn.execute("PRAGMA mmap_size=268435456")    # 256 MiB
+                conn.execute("PRAGMA cache_size=-64000")      # ~64 MB page cache
+                conn.execute("PRAGMA busy_timeout=5000")
+                _CONN = conn
+    return _CONN
+
+@contextmanager
+def locked() -> Iterator[sqlite3.Connection]:
+    """
+    The shared connection with _LOCK held. Use this (or transaction()) for every access;
+    never `with get_conn() as c:`, whose commit/rollback would end another thread's transaction.
+    """
+    with _LOCK:
+        yield get_conn()
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """Locked connection inside BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error)."""
+    with _LOCK:
+        c = get_conn()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            yield c
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        c.execute("COMMIT")
 
 # --- Schema ---
-SCHEMA = """
+# Pure key->value tables are clustered on their primary key (WITHOUT ROWID);
+# STRICT needs SQLite 3.37+, older libraries just get the WITHOUT ROWID part.
+_KV_TABLE_OPTS = "WITHOUT ROWID, STRICT" if sqlite3.sqlite_version_info >= (3, 37, 0) else "WITHOUT ROWID"
+
+_GUILD_SETTINGS_DDL = f"""CREATE TABLE IF NOT EXISTS {{name}} (
+  guild_id INTEGER NOT NULL,
+  key TEXT NOT NULL,
+  value TEXT,
+  PRIMARY KEY (guild_id, key)
+) {_KV_TABLE_OPTS}"""
+
+_USER_COUNTS_DDL = f"""CREATE TABLE IF NOT EXISTS {{name}} (
+  guild_id INTEGER NOT NULL,
+  user_id INTEGER NOT NULL,
+  cnt INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (guild_id, user_id)
+) {_KV_TABLE_OPTS}"""
+
+# table -> (DDL template, copy expressions coercing old loosely-typed rows for STRICT)
+_KV_TABLES = {
+    "guild_settings": (
+        _GUILD_SETTINGS_DDL,
+        "CAST(guild_id AS INTEGER), CAST(key AS TEXT), CAST(value AS TEXT)",
+    ),
+    "counting_user_counts": (
+        _USER_COUNTS_DDL,
+        "CAST(guild_id AS INTEGER), CAST(user_id AS INTEGER), CAST(cnt AS INTEGER)",
+    ),
+}
+
+SCHEMA = f"""
 
 CREATE TABLE IF NOT EXISTS moderation_cases (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -30,12 +101,7 @@ CREATE TABLE IF NOT EXISTS moderation_cases (
 
 
 -- Key/Value settings
-CREATE TABLE IF NOT EXISTS guild_settings (
-  guild_id INTEGER NOT NULL,
-  key TEXT NOT NULL,
-  value TEXT,
-  PRIMARY KEY (guild_id, key)
-);
+{_GUILD_SETTINGS_DDL.format(name="guild_settings")};
 
 -- Counting state
 CREATE TABLE IF NOT EXISTS counting_state (
@@ -48,12 +114,7 @@ CREATE TABLE IF NOT EXISTS counting_state (
 );
 
 -- Per-user counting tallies
-CREATE TABLE IF NOT EXISTS counting_user_counts (
-  guild_id INTEGER NOT NULL,
-  user_id INTEGER NOT NULL,
-  cnt INTEGER NOT NULL DEFAULT 0,
-  PRIMARY KEY (guild_id, user_id)
-);
+{_USER_COUNTS_DDL.format(name="counting_user_counts")};
 
 -- One-time dashboard tokens
 CREATE TABLE IF NOT EXISTS ephemeral_tokens (
@@ -95,23 +156,84 @@ CREATE TABLE IF NOT EXISTS warnings (
   reason TEXT,
   created_ts INTEGER NOT NULL
 );
+
+-- Indexes for the hot lookups (warnings per user, recent cases, leaderboards)
+CREATE INDEX IF NOT EXISTS idx_warnings_guild_user_ts ON warnings(guild_id, user_id, created_ts DESC);
+CREATE INDEX IF NOT EXISTS idx_modcases_guild_id ON moderation_cases(guild_id, id DESC);
+CREATE INDEX IF NOT EXISTS idx_modactions_guild_ts ON mod_actions(guild_id, created_ts DESC);
+CREATE INDEX IF NOT EXISTS idx_counting_user_guild_cnt ON counting_user_counts(guild_id, cnt DESC);
+CREATE INDEX IF NOT EXISTS idx_tokens_expires ON ephemeral_tokens(expires_ts);
+-- Covering partial index for the log channel lookups (Logs cog bulk load, per-guild get)
+CREATE INDEX IF NOT EXISTS idx_settings_log_channel
+  ON guild_settings(guild_id, value) WHERE key='log_channel_id';
 """
 
+def _migrate_kv_tables(c: sqlite3.Connection) -> None:
+    """One-shot rebuild of key/value tables created before they had _KV_TABLE_OPTS."""
+    opts = [o.strip() for o in _KV_TABLE_OPTS.split(",")]
+    for name, (ddl, cols) in _KV_TABLES.items():
+        row = c.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (name,)).fetchone()
+        if row is None or all(o in (row["sql"] or "").upper() for o in opts):
+            continue
+        with transaction() as t:
+            t.execute(f"DROP TABLE IF EXISTS {name}_new")
+            t.execute(ddl.format(name=f"{name}_new"))
+            t.execute(f"INSERT INTO {name}_new SELECT {cols} FROM {name}")
+            t.execute(f"DROP TABLE {name}")  # its indexes go too; SCHEMA recreates them
+            t.execute(f"ALTER TABLE {name}_new RENAME TO {name}")
+
+_initialized = False
+
 def init():
-    with closing(get_conn()) as c:
+    """Create tables/indexes and refresh planner stats. Only does work once per process."""
+    global _initialized
+    with locked() as c:
+        if _initialized:
+            return
+        _migrate_kv_tables(c)
         c.executescript(SCHEMA)
+        c.execute("ANALYZE")
+        _initialized = True
 
 # ---------------- Settings (key/value) ----------------
+# LRU of (guild_id, key) -> stored value (None = no row). Settings only change
+# through set_setting, which evicts the entry, so hits never go stale.
+_SETTING_CACHE: "OrderedDict[tuple[int, str], Optional[str]]" = OrderedDict()
+_SETTING_CACHE_MAX = 4096
+_MISSING = object()
+
 def get_setting(guild_id: int, key: str, default: Optional[str] = None) -> Optional[str]:
-    with get_conn() as c:
-        row = c.execute(
-            "SELECT value FROM guild_settings WHERE guild_id=? AND key=?",
-            (guild_id, key)
-        ).fetchone()
-        return row["value"] if row else default
+    ck = (guild_id, key)
+    with locked() as c:
+        if ck in _SETTING_CACHE:
+            _SETTING_CACHE.move_to_end(ck)
+            value = _SETTING_CACHE[ck]
+        else:
+            row = c.execute(
+                "SELECT value FROM guild_settings WHERE guild_id=? AND key=?",
+                (guild_id, key)
+            ).fetchone()
+            value = row["value"] if row else None
+            _SETTING_CACHE[ck] = value
+            if len(_SETTING_CACHE) > _SETTING_CACHE_MAX:
+                _SETTING_CACHE.popitem(last=False)
+    return default if value is None else value
+
+# (guild_id, key) -> parsed "true"/"false" flag (None = no row); only flag keys land here.
+_BOOL_CACHE: dict[tuple[int, str], Optional[bool]] = {}
+
+def get_bool_setting(guild_id: int, key: str, default: bool = False) -> bool:
+    """A "true"/"false" setting as bool, parsed once per (guild, key) instead of per call."""
+    value = _BOOL_CACHE.get((guild_id, key), _MISSING)
+    if value is _MISSING:
+        raw = get_setting(guild_id, key)
+        value = _BOOL_CACHE[(guild_id, key)] = None if raw is None else (raw == "true")
+    return default if value is None else value
 
 def set_setting(guild_id: int, key: str, value: Optional[str]) -> None:
-    with get_conn() as c:
+    with locked() as c:
+        _SETTING_CACHE.pop((guild_id, key), None)
+        _BOOL_CACHE.pop((guild_id, key), None)
         if value is None:
             c.execute("DELETE FROM guild_settings WHERE guild_id=? AND key=?", (guild_id, key))
         else:
@@ -121,68 +243,181 @@ def set_setting(guild_id: int, key: str, value: Optional[str]) -> None:
                 (guild_id, key, value),
             )
 
+def get_settings_for_key(key: str) -> dict[int, str]:
+    """One key's value for every guild that has it set (guild_id -> value)."""
+    with locked() as c:
+        rows = c.execute("SELECT guild_id, value FROM guild_settings WHERE key=?", (key,)).fetchall()
+    return {int(r["guild_id"]): r["value"] for r in rows}
+
 # ---------------- Counting state ----------------
-def get_state(guild_id: int) -> dict:
-    with get_conn() as c:
-        row = c.execute("SELECT * FROM counting_state WHERE guild_id=?", (guild_id,)).fetchone()
+class CountingState(NamedTuple):
+    guild_id: int
+    channel_id: Optional[int]
+    last_number: int
+    last_user_id: Optional[int]
+    high_score: int
+    high_scorer_id: Optional[int]
+
+_GET_STATE_SQL = f"SELECT {', '.join(CountingState._fields)} FROM counting_state WHERE guild_id=?"
+
+# guild_id -> state. Rows only change through set_state, which patches the entry,
+# so the counting listener reads every message from memory.
+_STATE_CACHE: dict[int, CountingState] = {}
+
+# guild_id -> counting channel id for every configured guild, bulk-loaded on first use,
+# so the message listener can drop non-counting channels without touching state at all.
+_COUNTING_CHANNELS: Optional[dict[int, int]] = None
+
+def get_counting_channel(guild_id: int) -> Optional[int]:
+    global _COUNTING_CHANNELS
+    channels = _COUNTING_CHANNELS
+    if channels is None:
+        with locked() as c:
+            if _COUNTING_CHANNELS is None:
+                rows = c.execute(
+                    "SELECT guild_id, channel_id FROM counting_state WHERE channel_id IS NOT NULL"
+                ).fetchall()
+                _COUNTING_CHANNELS = {int(r["guild_id"]): int(r["channel_id"]) for r in rows}
+            channels = _COUNTING_CHANNELS
+    return channels.get(guild_id)
+
+def get_state(guild_id: int) -> CountingState:
+    st = _STATE_CACHE.get(guild_id)
+    if st is not None:
+        return st
+    with locked() as c:
+        row = c.execute(_GET_STATE_SQL, (guild_id,)).fetchone()
         if row:
-            return dict(row)
-        c.execute(
-            "INSERT INTO counting_state(guild_id, channel_id, last_number, last_user_id, high_score, high_scorer_id) "
-            "VALUES (?,?,?,?,?,?)",
-            (guild_id, None, 0, None, 0, None),
-        )
-        return {
-            "guild_id": guild_id,
-            "channel_id": None,
-            "last_number": 0,
-            "last_user_id": None,
-            "high_score": 0,
-            "high_scorer_id": None,
-        }
+            st = CountingState._make(row)
+        else:
+            c.execute(
+                "INSERT INTO counting_state(guild_id, channel_id, last_number, last_user_id, high_score, high_scorer_id) "
+                "VALUES (?,?,?,?,?,?)",
+                (guild_id, None, 0, None, 0, None),
+            )
+            st = CountingState(guild_id, None, 0, None, 0, None)
+        _STATE_CACHE[guild_id] = st
+    return st
+
+def _flagged_params(cols: tuple[str, ...], fields: dict) -> list:
+    """(write?, value) pairs for every column, so one fixed statement serves any subset."""
+    unknown = fields.keys() - set(cols)
+    if unknown:
+        raise TypeError(f"unknown column(s): {', '.join(sorted(unknown))}")
+    params: list = []
+    for col in cols:
+        if col in fields:
+            params += (1, fields[col])
+        else:
+            params += (0, None)
+    return params
+
+_STATE_COLS = ("channel_id", "last_number", "last_user_id", "high_score", "high_scorer_id")
+_SET_STATE_SQL = (
+    "UPDATE counting_state SET "
+    + ", ".join(f"{col}=CASE WHEN ? THEN ? ELSE {col} END" for col in _STATE_COLS)
+    + " WHERE guild_id=?"
+)
+
+def _write_state(c: sqlite3.Connection, guild_id: int, fields: dict) -> None:
+    """UPDATE counting_state and mirror the change into the caches (caller holds the lock)."""
+    params = _flagged_params(_STATE_COLS, fields)
+    params.append(guild_id)
+    if c.execute(_SET_STATE_SQL, params).rowcount == 0:
+        return  # no row yet: nothing changed, nothing to mirror
+    cached = _STATE_CACHE.get(guild_id)
+    if cached is not None:
+        _STATE_CACHE[guild_id] = cached._replace(**fields)
+    if "channel_id" in fields and _COUNTING_CHANNELS is not None:
+        if fields["channel_id"] is None:
+            _COUNTING_CHANNELS.pop(guild_id, None)
+        else:
+            _COUNTING_CHANNELS[guild_id] = int(fields["channel_id"])
 
 def set_state(guild_id: int, **kwargs) -> None:
     if not kwargs:
         return
-    keys = ", ".join([f"{k}=?" for k in kwargs.keys()])
-    vals = list(kwargs.values()) + [guild_id]
-    with get_conn() as c:
-        c.execute(f"UPDATE counting_state SET {keys} WHERE guild_id=?", vals)
+    with locked() as c:
+        _write_state(c, guild_id, kwargs)
+
+# Per-user tallies are coalesced in memory and written in one executemany shortly
+# after the first count of a burst, so a busy channel doesn't commit an UPSERT per message.
+_BUMP_USER_COUNT_SQL = (
+    "INSERT INTO counting_user_counts(guild_id, user_id, cnt) VALUES (?,?,?) "
+    "ON CONFLICT(guild_id, user_id) DO UPDATE SET cnt=cnt+excluded.cnt"
+)
+_COUNT_FLUSH_DELAY = 2.0  # seconds
+_pending_counts: "Counter[tuple[int, int]]" = Counter()
+_count_flush_timer: Optional[threading.Timer] = None
+
+def flush_user_counts() -> None:
+    """Write any buffered counting_user_counts increments in a single transaction."""
+    global _count_flush_timer
+    with _LOCK:
+        _count_flush_timer = None
+        if not _pending_counts:
+            return
+        rows = [(gid, uid, n) for (gid, uid), n in _pending_counts.items()]
+        _pending_counts.clear()
+        with transaction() as c:
+            c.executemany(_BUMP_USER_COUNT_SQL, rows)
+
+atexit.register(flush_user_counts)
 
 def bump_user_count(guild_id: int, user_id: int) -> None:
-    with get_conn() as c:
-        c.execute(
-            "INSERT INTO counting_user_counts(guild_id, user_id, cnt) VALUES (?,?,0) "
-            "ON CONFLICT(guild_id, user_id) DO NOTHING",
-            (guild_id, user_id),
-        )
-        c.execute(
-            "UPDATE counting_user_counts SET cnt=cnt+1 WHERE guild_id=? AND user_id=?",
-            (guild_id, user_id)
-        )
+    global _count_flush_timer
+    with _LOCK:
+        _pending_counts[(guild_id, user_id)] += 1
+        if _count_flush_timer is None:
+            _count_flush_timer = threading.Timer(_COUNT_FLUSH_DELAY, flush_user_counts)
+            _count_flush_timer.daemon = True
+            _count_flush_timer.start()
+
+def record_good_count(guild_id: int, number: int, user_id: int, new_record: bool = False) -> None:
+    """
+    A correct count: advance the state and queue a bump of the user's tally.
+    The high-score columns are only written when this count set a new record.
+    """
+    fields = {"last_number": number, "last_user_id": user_id}
+    if new_record:
+        fields["high_score"] = number
+        fields["high_scorer_id"] = user_id
+    with locked() as c:
+        _write_state(c, guild_id, fields)
+        bump_user_count(guild_id, user_id)
 
 def top_counters(guild_id: int, limit: int = 10):
-    with get_conn() as c:
+    flush_user_counts()  # read-your-writes
+    with locked() as c:
         return c.execute(
             "SELECT user_id, cnt FROM counting_user_counts WHERE guild_id=? ORDER BY cnt DESC LIMIT ?",
             (guild_id, limit),
         ).fetchall()
 
 # ---------------- Guild Config (dashboard server management) ----------------
+_CONFIG_COLS = ("log_channel_id", "welcome_channel_id", "welcome_message", "autorole_id")
+_SET_CONFIG_SQL = (
+    f"INSERT INTO guild_config(guild_id, {', '.join(_CONFIG_COLS)}) "
+    f"VALUES (?{',?' * len(_CONFIG_COLS)}) "
+    "ON CONFLICT(guild_id) DO UPDATE SET "
+    + ", ".join(
+        f"{col}=CASE WHEN ? THEN excluded.{col} ELSE guild_config.{col} END" for col in _CONFIG_COLS
+    )
+)
+
 def set_guild_config(guild_id: int, **fields) -> None:
     """Upsert selected fields for a guild's server-management settings."""
     if not fields:
         return
-    cols = ", ".join(f"{k}=?" for k in fields.keys())
-    vals = list(fields.values())
-    with get_conn() as c:
-        # ensure row exists
-        c.execute("INSERT OR IGNORE INTO guild_config(guild_id) VALUES (?)", (guild_id,))
-        c.execute(f"UPDATE guild_config SET {cols} WHERE guild_id=?", (*vals, guild_id))
+    pairs = _flagged_params(_CONFIG_COLS, fields)
+    # VALUES takes the new values (NULL for untouched columns), the UPDATE takes the flags
+    params = [guild_id, *pairs[1::2], *pairs[0::2]]
+    with locked() as c:
+        c.execute(_SET_CONFIG_SQL, params)
 
 def get_guild_config(guild_id: int) -> dict:
     """Fetch server-management settings for a guild. Returns sensible defaults."""
-    with get_conn() as c:
+    with locked() as c:
         row = c.execute(
             "SELECT log_channel_id, welcome_channel_id, welcome_message, autorole_id "
             "FROM guild_config WHERE guild_id=?",
@@ -211,57 +446,114 @@ def get_guild_config(guild_id: int) -> dict:
 
 import json, time
 
+_EMPTY_JSON = "{}"
+_ADD_CASE_SQL = (
+    "INSERT INTO moderation_cases(guild_id,user_id,moderator_id,action,reason,created_ts,extra_json)"
+    " VALUES (?,?,?,?,?,?,?)"
+)
+
+def _case_row(guild_id: int, user_id: int, moderator_id: int, action: str,
+              reason: Optional[str], extra: Optional[dict]) -> tuple:
+    return (guild_id, user_id, moderator_id, action, reason or "", int(time.time()),
+            _EMPTY_JSON if not extra else json.dumps(extra, separators=(",", ":")))
+
 def add_case(guild_id: int, user_id: int, moderator_id: int, action: str,
              reason: Optional[str] = None, extra: Optional[dict] = None) -> int:
-    with get_conn() as c:
-        cur = c.execute(
-            "INSERT INTO moderation_cases(guild_id,user_id,moderator_id,action,reason,created_ts,extra_json)"
-            " VALUES (?,?,?,?,?,?,?)",
-            (guild_id, user_id, moderator_id, action, reason or "", int(time.time()),
-             json.dumps(extra or {}))
-        )
+    flush_mod_log()  # keep case ids in the order the actions happened
+    with locked() as c:
+        cur = c.execute(_ADD_CASE_SQL, _case_row(guild_id, user_id, moderator_id, action, reason, extra))
         new_id = cur.lastrowid
         if new_id is None:
             new_id = c.execute("SELECT last_insert_rowid()").fetchone()[0]
         return int(new_id)
 
+def queue_case(guild_id: int, user_id: int, moderator_id: int, action: str,
+               reason: Optional[str] = None, extra: Optional[dict] = None) -> None:
+    """add_case for callers that don't need the id: buffered with the mod-log rows."""
+    row = _case_row(guild_id, user_id, moderator_id, action, reason, extra)
+    with _LOCK:
+        _pending_cases.append(row)
+        _schedule_mod_log_flush()
+
 def list_cases(guild_id: int, limit: int = 25):
-    with get_conn() as c:
+    flush_mod_log()  # read-your-writes
+    with locked() as c:
         return c.execute(
             "SELECT * FROM moderation_cases WHERE guild_id=? ORDER BY id DESC LIMIT ?",
             (guild_id, limit)
         ).fetchall()
 
 def get_case(guild_id: int, case_id: int):
-    with get_conn() as c:
+    flush_mod_log()
+    with locked() as c:
         return c.execute(
             "SELECT * FROM moderation_cases WHERE guild_id=? AND id=?",
             (guild_id, case_id)
         ).fetchone()
 
 # ---------------- Moderation helpers (optional but handy) ----------------
+# mod_actions / warnings / queued case rows are buffered and written together shortly
+# after the first row of a burst arrives, so e.g. a purge logging 100 actions commits once.
+_MODLOG_FLUSH_DELAY = 0.1  # seconds
+_pending_cases: list[tuple] = []
+_pending_actions: list[tuple] = []
+_pending_warnings: list[tuple] = []
+_flush_timer: Optional[threading.Timer] = None
+
+def _schedule_mod_log_flush() -> None:
+    # caller holds _LOCK
+    global _flush_timer
+    if _flush_timer is None:
+        _flush_timer = threading.Timer(_MODLOG_FLUSH_DELAY, flush_mod_log)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+def flush_mod_log() -> None:
+    """Write any buffered moderation_cases / mod_actions / warnings rows in a single transaction."""
+    global _flush_timer
+    with _LOCK:
+        _flush_timer = None
+        if not _pending_cases and not _pending_actions and not _pending_warnings:
+            return
+        cases, actions, warns = _pending_cases[:], _pending_actions[:], _pending_warnings[:]
+        _pending_cases.clear()
+        _pending_actions.clear()
+        _pending_warnings.clear()
+        with transaction() as c:
+            if cases:
+                c.executemany(_ADD_CASE_SQL, cases)
+            if actions:
+                c.executemany(
+                    "INSERT INTO mod_actions(guild_id,user_id,moderator_id,action,reason,points,created_ts) "
+                    "VALUES (?,?,?,?,?,?,?)",
+                    actions,
+                )
+            if warns:
+                c.executemany(
+                    "INSERT INTO warnings(guild_id,user_id,moderator_id,points,reason,created_ts) "
+                    "VALUES (?,?,?,?,?,?)",
+                    warns,
+                )
+
+atexit.register(flush_mod_log)
+
 def add_mod_action(guild_id: int, user_id: int, moderator_id: int, action: str,
                    reason: Optional[str] = None, points: int = 0, ts: Optional[int] = None) -> None:
     ts = ts or int(time.time())
-    with get_conn() as c:
-        c.execute(
-            "INSERT INTO mod_actions(guild_id,user_id,moderator_id,action,reason,points,created_ts) "
-            "VALUES (?,?,?,?,?,?,?)",
-            (guild_id, user_id, moderator_id, action, reason, points, ts),
-        )
+    with _LOCK:
+        _pending_actions.append((guild_id, user_id, moderator_id, action, reason, points, ts))
+        _schedule_mod_log_flush()
 
 def add_warning(guild_id: int, user_id: int, moderator_id: int,
                 points: int = 1, reason: Optional[str] = None, ts: Optional[int] = None) -> None:
     ts = ts or int(time.time())
-    with get_conn() as c:
-        c.execute(
-            "INSERT INTO warnings(guild_id,user_id,moderator_id,points,reason,created_ts) "
-            "VALUES (?,?,?,?,?,?)",
-            (guild_id, user_id, moderator_id, points, reason, ts),
-        )
+    with _LOCK:
+        _pending_warnings.append((guild_id, user_id, moderator_id, points, reason, ts))
+        _schedule_mod_log_flush()
 
 def get_warnings(guild_id: int, user_id: int):
-    with get_conn() as c:
+    flush_mod_log()  # read-your-writes
+    with locked() as c:
         return c.execute(
             "SELECT id, points, reason, created_ts, moderator_id "
             "FROM warnings WHERE guild_id=? AND user_id=? ORDER BY created_ts DESC",
@@ -269,5 +561,16 @@ def get_warnings(guild_id: int, user_id: int):
         ).fetchall()
 
 def clear_warnings(guild_id: int, user_id: int) -> None:
-    with get_conn() as c:
+    flush_mod_log()
+    with locked() as c:
         c.execute("DELETE FROM warnings WHERE guild_id=? AND user_id=?", (guild_id, user_id))
+
+# ---------------- Async wrappers (keep SQLite off the event loop) ----------------
+async def aset_setting(guild_id: int, key: str, value: Optional[str]) -> None:
+    await asyncio.to_thread(set_setting, guild_id, key, value)
+
+async def aget_settings_for_key(key: str) -> dict[int, str]:
+    return await asyncio.to_thread(get_settings_for_key, key)
+
+async def alist_cases(guild_id: int, limit: int = 25):
+    return await asyncio.to_thread(list_cases, guild_id, limit)
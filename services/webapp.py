@@ -1,5 +1,6 @@
 from __future__ import annotations
 import os, time, asyncio, json, secrets
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Optional
 
@@ -7,12 +8,13 @@ from fastapi import FastAPI, Request, Form, Depends, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from starlette.status import HTTP_303_SEE_OTHER
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 import httpx
 
 from services.db import (
-    get_conn, init,
+    locked, init,
     get_state, set_state,
-    get_setting, set_setting,
+    get_setting, set_setting, get_bool_setting, top_counters,
     get_guild_config, set_guild_config,
 )
 
@@ -42,7 +44,18 @@ def create_app(version: str = "dev") -> FastAPI:
     Pass version from bot.py:  app = create_app(version=CELESTIGUARD_VERSION)
     """
     init()
-    app = FastAPI(title="CelestiGuard Dashboard")
+
+    # One pooled client for every Discord REST call: keep-alive reuses the TCP/TLS
+    # connection across logins instead of a fresh handshake per request.
+    http_client: Optional[httpx.AsyncClient] = None
+
+    @asynccontextmanager
+    async def _lifespan(_app: FastAPI):
+        yield
+        if http_client is not None:
+            await http_client.aclose()
+
+    app = FastAPI(title="CelestiGuard Dashboard", lifespan=_lifespan)
 
     # --- Session & Discord OAuth config ---
     SESSION_SECRET = os.getenv("SESSION_SECRET", "change-me")  # set a strong random value in .env
@@ -58,6 +71,15 @@ def create_app(version: str = "dev") -> FastAPI:
         https_only=False,  # behind real HTTPS / reverse proxy is fine
     )
 
+    def _http() -> httpx.AsyncClient:
+        nonlocal http_client
+        if http_client is None or http_client.is_closed:
+            http_client = httpx.AsyncClient(timeout=10.0, limits=httpx.Limits(max_keepalive_connections=10))
+        return http_client
+
+    # Compress HTML/JSON bodies (the changelog is polled uncached); adds Vary: Accept-Encoding.
+    app.add_middleware(GZipMiddleware, minimum_size=512)
+
     # ---------- Auth (Discord OAuth) ----------
     def _is_logged_in(request: Request) -> bool:
         return "user" in request.session and "access_token" in request.session
@@ -92,11 +114,10 @@ def create_app(version: str = "dev") -> FastAPI:
         token = request.session["access_token"]
         gids: list[str] = []
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                r = await client.get(
-                    f"{DISCORD_API}/users/@me/guilds",
-                    headers={"Authorization": f"Bearer {token}"},
-                )
+            r = await _http().get(
+                f"{DISCORD_API}/users/@me/guilds",
+                headers={"Authorization": f"Bearer {token}"},
+            )
             if r.status_code == 200:
                 gids = [str(g.get("id")) for g in r.json() if g.get("id")]
         except Exception:
@@ -239,8 +260,7 @@ export OAUTH_REDIRECT_URI=https://YOUR_DOMAIN/auth/callback
         }
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            tr = await client.post(f"{DISCORD_API}/oauth2/token", data=form, headers=headers)
+        tr = await _http().post(f"{DISCORD_API}/oauth2/token", data=form, headers=headers)
 
         if tr.status_code != 200:
             payload = None
@@ -270,9 +290,9 @@ export OAUTH_REDIRECT_URI=https://YOUR_DOMAIN/auth/callback
             return JSONResponse({"stage": "token", "error": "No access token in response"}, status_code=401)
 
         auth_hdr = {"Authorization": f"Bearer {access_token}"}
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            ur = await client.get(f"{DISCORD_API}/users/@me", headers=auth_hdr)
-            gr = await client.get(f"{DISCORD_API}/users/@me/guilds", headers=auth_hdr)
+        client = _http()
+        ur = await client.get(f"{DISCORD_API}/users/@me", headers=auth_hdr)
+        gr = await client.get(f"{DISCORD_API}/users/@me/guilds", headers=auth_hdr)
 
         if ur.status_code != 200:
             why = None
@@ -306,12 +326,7 @@ export OAUTH_REDIRECT_URI=https://YOUR_DOMAIN/auth/callback
 
     # ---------- Helpers ----------
     def _top(gid: int):
-        with get_conn() as c:
-            rows = c.execute(
-                "SELECT user_id, cnt FROM counting_user_counts WHERE guild_id=? ORDER BY cnt DESC LIMIT 10",
-                (gid,),
-            ).fetchall()
-        return [dict(r) for r in rows]
+        return [dict(r) for r in top_counters(gid, 10)]
 
     async def _guild_channels(gid: int):
         chans = []
@@ -392,8 +407,12 @@ export OAUTH_REDIRECT_URI=https://YOUR_DOMAIN/auth/callback
                 return p
         return None
 
+    # Resolved once at startup; searched for again only while missing (or after it disappears).
+    changelog_path: Optional[Path] = _find_changelog_file()
+
     def _load_changelog() -> list[dict]:
-        p = _find_changelog_file()
+        nonlocal changelog_path
+        p = changelog_path = changelog_path or _find_changelog_file()
         if not p:
             return []
         try:
@@ -402,13 +421,16 @@ export OAUTH_REDIRECT_URI=https://YOUR_DOMAIN/auth/callback
                 if isinstance(data, dict):
                     data = [data]
                 return data if isinstance(data, list) else []
+        except FileNotFoundError:
+            changelog_path = None
+            return []
         except Exception:
             return []
 
     # ---------- Status helpers ----------
     def _db_ok() -> bool:
         try:
-            with get_conn() as c:
+            with locked() as c:
                 c.execute("SELECT 1")
             return True
         except Exception:
@@ -601,8 +623,15 @@ export OAUTH_REDIRECT_URI=https://YOUR_DOMAIN/auth/callback
             },
         )
 
+    # The changelog page only varies with the bot avatar; rendered once per avatar URL.
+    changelog_page_cache: Optional[tuple[str, bytes]] = None
+
     @app.get("/changelog", response_class=HTMLResponse)
     async def changelog_page():
+        nonlocal changelog_page_cache
+        avatar = _bot_avatar_url(28)
+        if changelog_page_cache is not None and changelog_page_cache[0] == avatar:
+            return HTMLResponse(changelog_page_cache[1])
         # NOTE: NOT an f-string, so ${...} is left for JS template literals.
         body = """
         <div class="row" style="grid-template-columns:1fr">
@@ -648,7 +677,9 @@ export OAUTH_REDIRECT_URI=https://YOUR_DOMAIN/auth/callback
           })();
         </script>
         """
-        return HTMLResponse(page_shell("Changelog • CelestiGuard", "", body, version, _bot_avatar_url(28)))
+        html = page_shell("Changelog • CelestiGuard", "", body, version, avatar).encode("utf-8")
+        changelog_page_cache = (avatar, html)
+        return HTMLResponse(html)
 
     # ---------- Status API & Page (public) ----------
     @app.get("/api/status")
@@ -887,8 +918,8 @@ export OAUTH_REDIRECT_URI=https://YOUR_DOMAIN/auth/callback
         _member: bool = Depends(_member_dep),
     ):
         st = get_state(gid)
-        extreme = (get_setting(gid, "extreme_mode", "false") == "true")
-        delete_wrong = (get_setting(gid, "delete_wrong", "true") == "true")
+        extreme = get_bool_setting(gid, "extreme_mode", False)
+        delete_wrong = get_bool_setting(gid, "delete_wrong", True)
         top = _top(gid)
         channels = await _guild_channels(gid)
         roles = await _guild_roles(gid)
@@ -904,13 +935,13 @@ export OAUTH_REDIRECT_URI=https://YOUR_DOMAIN/auth/callback
         ch_name = None
         if _bot:
             g = _bot.get_guild(gid)
-            if g and st.get("channel_id"):
-                ch = g.get_channel(st["channel_id"])
+            if g and st.channel_id:
+                ch = g.get_channel(st.channel_id)
                 ch_name = f"#{getattr(ch,'name','?')}" if ch else None
 
         # selects
         options = "<option value=''>— no change —</option>" + "".join(
-            f"<option value='{ch['id']}'{' selected' if st.get('channel_id')==ch['id'] else ''}>{ch['name']}</option>"
+            f"<option value='{ch['id']}'{' selected' if st.channel_id==ch['id'] else ''}>{ch['name']}</option>"
             for ch in channels
         )
         log_opts = "<option value=''>— disabled —</option>" + "".join(
@@ -956,10 +987,10 @@ export OAUTH_REDIRECT_URI=https://YOUR_DOMAIN/auth/callback
           <div class="row">
             <div class="card">
               <h2>Counting</h2>
-              <div class="muted" style="margin-bottom:8px">Channel: {ch_name or st.get("channel_id") or "not set"}</div>
+              <div class="muted" style="margin-bottom:8px">Channel: {ch_name or st.channel_id or "not set"}</div>
               <div class="kv" style="margin-bottom:10px">
-                <div>Current: <b>{st["last_number"]}</b></div>
-                <div>Next: <b>{(st["last_number"] or 0)+1}</b></div>
+                <div>Current: <b>{st.last_number}</b></div>
+                <div>Next: <b>{(st.last_number or 0)+1}</b></div>
               </div>
               <form method='post' action='/guild/{gid}/counting'>
                 <label>Channel</label>
@@ -1054,7 +1085,7 @@ export OAUTH_REDIRECT_URI=https://YOUR_DOMAIN/auth/callback
             g = _bot.get_guild(gid)
             if g:
                 st = get_state(gid)
-                ch = g.get_channel(st.get("channel_id"))
+                ch = g.get_channel(st.channel_id)
                 if ch:
                     from cogs.counting import backfill_from_history, get_extreme_mode
                     extreme = get_extreme_mode(gid)